@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the Iden Challenge automation.
+
+Starts mock_iden_server.py in-process and runs the full IdenUnifiedAutomation.run() pipeline
+for every combination of scroll strategy, harvest mode, export format and session state.
+It records per-phase timings (browser launch, session restore, authentication, navigation,
+extraction, export), scroll statistics, row cleaning time and rows/second, and writes them
+as JSON so two versions can be compared:
+
+    python benchmark.py --rows 5000 --output bench_new.json --compare bench_old.json
+
+Session states: "cold" starts without a saved session (login + save), "warm" restores the
+session saved by an unmeasured priming run, "expired" starts from a session whose token has
+already expired (offline check, then login).
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from iden_unified import IdenUnifiedAutomation, OUTPUT_EXTENSIONS, atomic_write_json, logger
+from mock_iden_server import make_token, start_server
+
+BENCH_CREDENTIALS = {"username": "bench@example.com", "password": "bench"}
+SESSION_STATES = ("cold", "warm", "expired")
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def new_automation(server_url: str, workdir: str, scenario: Dict[str, Any], args) -> IdenUnifiedAutomation:
+    automation = IdenUnifiedAutomation(dict(BENCH_CREDENTIALS), os.path.join(workdir, "session.json"))
+    automation.set_base_url(server_url)
+    automation.scroll_strategy = scenario["strategy"]
+    automation.harvest_mode = scenario["harvest_mode"]
+    automation.output_format = scenario["format"]
+    automation.output_file = os.path.join(workdir, "products" + OUTPUT_EXTENSIONS[scenario["format"]])
+    automation.workers = args.workers
+    automation.deep_link_file = os.path.join(workdir, "deep_link.json")
+    automation.api_template_file = os.path.join(workdir, "api_template.json")
+    return automation
+
+
+def prepare_session(server_url: str, workdir: str, scenario: Dict[str, Any], args) -> None:
+    """Put the scenario's session file in the state it asks for."""
+    session_path = os.path.join(workdir, "session.json")
+    if scenario["session"] == "cold":
+        if os.path.exists(session_path):
+            os.remove(session_path)
+        return
+    if not os.path.exists(session_path):
+        # Unmeasured priming run: log in once and save the session
+        primer = new_automation(server_url, workdir, scenario, args)
+        primer.run(headless=True, target_count=1)
+    if scenario["session"] == "expired":
+        store = IdenUnifiedAutomation(dict(BENCH_CREDENTIALS), session_path).session_store
+        session_storage = dict(store.session_storage)
+        session_storage["authToken"] = make_token(BENCH_CREDENTIALS["username"], ttl=-60)
+        store.save(store.storage_state, session_storage, store.local_storage)
+
+
+def run_scenario(server_url: str, workdir: str, scenario: Dict[str, Any], args) -> Dict[str, Any]:
+    prepare_session(server_url, workdir, scenario, args)
+    automation = new_automation(server_url, workdir, scenario, args)
+    start = time.perf_counter()
+    result = automation.run(headless=True, target_count=args.rows)
+    seconds = time.perf_counter() - start
+    products = result if isinstance(result, int) and not isinstance(result, bool) else 0
+    phases = {name: round(value, 4) for name, value in automation.phase_timings.items()}
+    # The mock's row count is known, so a run that dropped rows is a failure, not a faster run
+    return {
+        "ok": products == args.rows,
+        "products": products,
+        "missing_rows": args.rows - products,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(products / seconds, 1) if seconds else 0.0,
+        "phases": phases,
+        # Measured during the run but nested inside extraction, so kept out of phases
+        "cleaning_seconds": round(automation.cleaning_seconds, 4),
+        "scroll": automation.scroll_stats,
+        "wait_savings": automation.wait_savings,
+        "metrics": automation.metrics.to_dict(),
+    }
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median over repeats, so one slow run does not look like a regression."""
+    ok_runs = [r for r in runs if r["ok"]] or runs
+    phase_names = sorted({name for r in ok_runs for name in r["phases"]})
+    return {
+        "ok": all(r["ok"] for r in runs),
+        "repeats": len(runs),
+        "products": ok_runs[-1]["products"],
+        "missing_rows": max(r["missing_rows"] for r in runs),
+        "seconds": round(statistics.median(r["seconds"] for r in ok_runs), 4),
+        "rows_per_second": round(statistics.median(r["rows_per_second"] for r in ok_runs), 1),
+        "phases": {name: round(statistics.median(r["phases"].get(name, 0.0) for r in ok_runs), 4)
+                   for name in phase_names},
+        "cleaning_seconds": round(statistics.median(r["cleaning_seconds"] for r in ok_runs), 4),
+        "scroll": ok_runs[-1]["scroll"],
+        "runs": runs,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_file: str, tolerance: float) -> List[str]:
+    """Scenarios (and phases) that got slower than the baseline by more than tolerance."""
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["name"])
+        if not previous or not previous["ok"]:
+            continue
+        if result["seconds"] > previous["seconds"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: {previous['seconds']:.2f}s -> {result['seconds']:.2f}s")
+        for phase, seconds in result["phases"].items():
+            before = previous["phases"].get(phase)
+            # Ignore sub-100ms phases, their noise dwarfs any real change
+            if before and before > 0.1 and seconds > before * (1 + tolerance):
+                regressions.append(f"{result['name']} [{phase}]: {before:.2f}s -> {seconds:.2f}s")
+        before = previous.get("cleaning_seconds")
+        if before and before > 0.1 and result["cleaning_seconds"] > before * (1 + tolerance):
+            regressions.append(f"{result['name']} [cleaning]: {before:.2f}s -> {result['cleaning_seconds']:.2f}s")
+    return regressions
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    print("\nBENCHMARK RESULTS:")
+    print("=" * 96)
+    print(f"{'scenario':<44} {'ok':<4} {'rows':>8} {'seconds':>9} {'rows/s':>9}  slowest phase")
+    for r in results:
+        slowest = max(r["phases"].items(), key=lambda item: item[1], default=("-", 0.0))
+        print(f"{r['name']:<44} {'yes' if r['ok'] else 'NO':<4} {r['products']:>8} {r['seconds']:>9.2f} "
+              f"{r['rows_per_second']:>9.1f}  {slowest[0]} {slowest[1]:.2f}s")
+    print("=" * 96)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the automation against the local mock server")
+    parser.add_argument("--rows", type=int, default=2332, help="Products in the mock table (default: 2332)")
+    parser.add_argument("--window", type=int, default=60, help="Mock table recycling window; 0 = append (default: 60)")
+    parser.add_argument("--render-ms", type=int, default=0, help="Mock render delay per scroll (default: 0)")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Mock API latency per page (default: 0)")
+    parser.add_argument("--strategies", default="fixed,adaptive", help="Scroll strategies (default: fixed,adaptive)")
+    parser.add_argument("--harvest-modes", default="incremental,observer",
+                        help="Harvest modes (default: incremental,observer)")
+    parser.add_argument("--formats", default="json,ndjson,csv", help="Export formats (default: json,ndjson,csv)")
+    parser.add_argument("--sessions", default="cold,warm", help=f"Session states out of {','.join(SESSION_STATES)} "
+                                                                 "(default: cold,warm)")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel workers per run (default: 1)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; the median is reported (default: 1)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results file (default: benchmark_results.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Slowdown that counts as a regression, as a fraction (default: 0.2)")
+    args = parser.parse_args()
+
+    sessions = args.sessions.split(",")
+    unknown = [s for s in sessions if s not in SESSION_STATES]
+    if unknown:
+        parser.error(f"unknown session state(s): {', '.join(unknown)}")
+    scenarios = [
+        {"strategy": strategy, "harvest_mode": mode, "format": fmt, "session": session,
+         "name": f"{strategy}/{mode}/{fmt}/{session}"}
+        for strategy, mode, fmt, session in itertools.product(
+            args.strategies.split(","), args.harvest_modes.split(","), args.formats.split(","), sessions)
+    ]
+
+    server = start_server(port=0, rows=args.rows, window=args.window, render_ms=args.render_ms,
+                          latency_ms=args.latency_ms)
+    workdir = tempfile.mkdtemp(prefix="iden_bench_")
+    logger.info(f"Benchmarking {len(scenarios)} scenarios against {server.url} in {workdir}")
+    results = []
+    try:
+        for scenario in scenarios:
+            print(f"\n>>> {scenario['name']}")
+            runs = [run_scenario(server.url, workdir, scenario, args) for _ in range(args.repeat)]
+            results.append({**scenario, **summarize(runs)})
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "window": args.window,
+            "render_ms": args.render_ms,
+            "latency_ms": args.latency_ms,
+            "workers": args.workers,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    atomic_write_json(args.output, report)
+    print_results(results)
+    print(f"Results written to {args.output}")
+
+    failed = [f"{r['name']} ({r['missing_rows']} rows missing)" for r in results if not r["ok"]]
+    if failed:
+        print(f"Failed scenarios: {', '.join(failed)}")
+    regressions = compare(results, args.compare, args.tolerance) if args.compare else []
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
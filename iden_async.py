@@ -0,0 +1,808 @@
+#!/usr/bin/env python3
+"""
+Asyncio engine for the Iden Challenge automation.
+
+AsyncIdenUnifiedAutomation keeps the run()/CLI contract of IdenUnifiedAutomation but drives
+playwright.async_api, so page I/O, file writes and several browser contexts can overlap in one
+event loop. Helpers that never touch the browser (row normalisation, dedupe keys, exporters,
+session files, HTTP replay) are inherited from the sync class; only browser calls are re-implemented.
+
+Run it through the main script:
+    python iden_unified.py --async --harvest-mode observer --output-format ndjson
+"""
+
+import asyncio
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from playwright.async_api import async_playwright, Page, BrowserContext, TimeoutError as PlaywrightTimeoutError
+
+from iden_unified import (
+    IdenUnifiedAutomation,
+    ProductTable,
+    STREAMING_FORMATS,
+    SCROLLABLE_PARENT_JS,
+    SCROLL_STEP_JS,
+    TABLE_SCHEMA_JS,
+    HARVEST_ROWS_JS,
+    WAIT_FOR_NEW_ROWS_JS,
+    INSTALL_ROW_OBSERVER_JS,
+    DRAIN_OBSERVED_ROWS_JS,
+    AUTH_DATA_PRESENT_JS,
+    LOGIN_SETTLED_JS,
+    LOGIN_STATE_JS,
+    SESSION_STORAGE_JS,
+    LOCAL_STORAGE_JS,
+    BROWSER_ARGS,
+    metric_span,
+    read_browser_endpoint,
+    session_restore_script,
+    logger,
+)
+
+
+class AsyncIdenUnifiedAutomation(IdenUnifiedAutomation):
+    """Async variant of IdenUnifiedAutomation with the same configuration attributes and run() result."""
+
+    async def _open_restored_page(self, shared: bool = False) -> Tuple[BrowserContext, Page, bool]:
+        """
+        Open a new page with the saved sessionStorage restored. Returns (context, page, valid).
+        With shared=True and an attached daemon, the page opens in the daemon's default context.
+        """
+        context = await self._new_context(shared)
+        page = await context.new_page()
+        await self.install_resource_blocking(context, page, shared)
+
+        # Restore saved sessionStorage in one init script, so the first navigation already has it
+        session_storage = self.session_store.session_storage
+        await page.add_init_script(session_restore_script(session_storage, self.challenge_url))
+        logger.info(f"Restoring {len(session_storage)} sessionStorage keys")
+
+        await page.goto(self.challenge_url, wait_until=self._restore_wait_until())
+        return context, page, "challenge" in page.url
+
+    @metric_span("setup_browser")
+    async def setup_browser(self, headless: bool = False, restore: bool = True) -> bool:
+        """
+        Initialize browser and context. With restore=False the saved session is ignored.
+        Returns True if an existing session was reused successfully, False otherwise.
+        """
+        try:
+            with self.timed_phase("browser_launch"):
+                if not (self.use_browser_daemon and await self.attach_browser()):
+                    self.pw = await async_playwright().start()
+                    self.browser = await self.pw.chromium.launch(headless=headless, args=BROWSER_ARGS)
+
+            with self.timed_phase("session_restore"):
+                if restore and self.has_valid_session_files():
+                    try:
+                        logger.info("Found existing session files, attempting to reuse...")
+                        self.context, self.page, valid = await self._open_restored_page(shared=True)
+                        if valid:
+                            logger.info("Existing session valid, skipping login")
+                            print("Session reused successfully! Skipping authentication...")
+                            return True
+                        logger.info("Session invalid, forcing fresh login")
+                        self.cleanup_invalid_session_files()
+                        if self.attached:
+                            await self.page.close()
+                        else:
+                            await self.context.close()
+                        return False
+                    except Exception as e:
+                        logger.warning(f"Failed to reuse existing session: {e}")
+                        self.cleanup_invalid_session_files()
+                        return False
+
+            # No valid session found,login needed
+            logger.info("Creating fresh browser context")
+            print("No valid session found, creating fresh browser context...")
+            self.context = await self._new_context(shared=True)
+            self.page = await self.context.new_page()
+            await self.install_resource_blocking(self.context, self.page, shared=True)
+            return False
+
+        except Exception as e:
+            logger.error(f"Browser setup failed: {e}")
+            raise
+
+    async def attach_browser(self) -> bool:
+        """Connect to the warm browser started with --serve-browser. Returns False if none is reachable."""
+        endpoint = read_browser_endpoint()
+        if not endpoint:
+            logger.info("No browser daemon running, launching a new browser")
+            return False
+        try:
+            self.pw = await async_playwright().start()
+            self.browser = await self.pw.chromium.connect_over_cdp(endpoint)
+            self.attached = True
+            logger.info(f"Attached to browser daemon at {endpoint}")
+            print(f"Attached to warm browser at {endpoint}")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not attach to browser daemon at {endpoint}: {e}")
+            if self.pw:
+                await self.pw.stop()
+                self.pw = None
+            return False
+
+    async def install_resource_blocking(self, context: BrowserContext, page: Page, shared: bool = False) -> None:
+        """Route requests through the resource blocker; page-level when sharing the daemon's context."""
+        if not self.resource_blocker:
+            return
+        await (page if shared and self.attached else context).route("**/*", self.resource_blocker.handle_async)
+        page.on("response", self.resource_blocker.on_response)
+
+    async def _new_context(self, shared: bool = False) -> BrowserContext:
+        """A new context, or with shared=True the daemon's default context when attached."""
+        if shared and self.attached and self.browser.contexts:
+            # Tracing is per context, and this one belongs to the daemon and every attached run
+            if self.playwright_trace:
+                logger.warning("Playwright tracing is not started on the browser daemon's shared context")
+            return self.browser.contexts[0]
+        context = await self.browser.new_context()
+        if shared and self.playwright_trace and context is not self.traced_context:
+            try:
+                await context.tracing.start(screenshots=True, snapshots=True, sources=True)
+                self.traced_context = context
+            except Exception as e:
+                logger.warning(f"Failed to start Playwright tracing: {e}")
+        return context
+
+    async def save_session(self) -> None:
+        """Save current session after a successful login on the challenge page."""
+        try:
+            if not self.context or not self.page:
+                logger.error("No context or page to save session from")
+                return
+            if "challenge" not in self.page.url:
+                logger.warning("Not on challenge page, skipping session save")
+                return
+
+            try:
+                storage_state, session_storage, local_storage = await asyncio.gather(
+                    self.context.storage_state(),
+                    self.page.evaluate(SESSION_STORAGE_JS), self.page.evaluate(LOCAL_STORAGE_JS)
+                )
+            except Exception as e:
+                logger.warning(f"Failed to read storage: {e}")
+                storage_state, session_storage, local_storage = await self.context.storage_state(), {}, {}
+
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.session_store.save, storage_state, session_storage, local_storage
+            )
+            logger.info(f"Session saved to {self.session_store.path}: {len(session_storage)} sessionStorage, "
+                        f"{len(local_storage)} localStorage keys")
+
+        except Exception as e:
+            logger.error(f"Failed to save storage state: {e}")
+
+    async def wait_for_idle_network(self, timeout_ms=10000, page: Optional[Page] = None):
+        """Wait for network to be idle."""
+        try:
+            await (page or self.page).wait_for_load_state("networkidle", timeout=timeout_ms)
+        except Exception:
+            pass
+
+    async def wait_for_auth_data(self, timeout_ms=10000) -> bool:
+        """Wait for authentication data to be present before saving session."""
+        try:
+            logger.info("Waiting for authentication data to be present...")
+            await self.page.wait_for_function(AUTH_DATA_PRESENT_JS, timeout=timeout_ms)
+            logger.info("Authentication data detected")
+            return True
+        except Exception as e:
+            logger.warning(f"Error waiting for auth data: {e}")
+            return False
+
+    @metric_span("authenticate")
+    async def authenticate(self) -> bool:
+        """Authenticate only if no valid session exists."""
+        try:
+            await self.page.goto(self.login_url)
+            await self.wait_for_idle_network()
+
+            if not (self.credentials["username"] and self.credentials["password"]):
+                logger.error("Credentials missing")
+                return False
+
+            await self.page.fill('input[type="email"]', self.credentials["username"])
+            await self.page.fill('input[type="password"]', self.credentials["password"])
+            before_login = await self.page.evaluate(LOGIN_STATE_JS)
+            await self.page.click('button[type="submit"]')
+
+            with self.condition_wait("authentication", replaced_seconds=2):
+                try:
+                    await self.page.wait_for_function(LOGIN_SETTLED_JS, arg=before_login, timeout=15000)
+                except PlaywrightTimeoutError:
+                    logger.warning("Login did not navigate or store a session token, continuing to the challenge page")
+
+            # Go to challenge page after login
+            await self.page.goto(self.challenge_url)
+            await self.wait_for_idle_network()
+
+            if "challenge" in self.page.url:
+                logger.info("Authentication successful, saving session")
+                with self.condition_wait("authentication", replaced_seconds=3):
+                    auth_data_present = await self.wait_for_auth_data(timeout_ms=15000)
+                if auth_data_present:
+                    logger.info("Authentication data confirmed, saving session")
+                else:
+                    logger.warning("Authentication data not detected, but proceeding anyway")
+                await self.save_session()
+                return True
+            logger.error("Failed to reach challenge page after login")
+            return False
+        except Exception as e:
+            logger.error(f"Authentication failed: {e}")
+            return False
+
+    async def smart_click(self, page: Page, role: str, name: str, timeout: int = 30000):
+        """Click button with robust waiting and error handling using regex for resiliency."""
+        try:
+            locator = page.get_by_role(role, name=re.compile(rf"^{re.escape(name)}$", re.I))
+            await locator.wait_for(state="visible", timeout=timeout)
+            await locator.click()
+            logger.info(f"Successfully clicked '{name}'")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to click '{name}': {e}")
+            return False
+
+    async def open_deep_link(self, page: Page) -> bool:
+        """Jump straight to the recorded product table URL. On failure the page is left on the challenge start."""
+        url = self.load_deep_link()
+        if not url:
+            return False
+        try:
+            logger.info(f"Opening product table deep link: {url}")
+            await page.goto(url, wait_until="domcontentloaded")
+            await page.wait_for_selector("table >> tbody tr", timeout=10000)
+            logger.info("Table found via deep link")
+            return True
+        except Exception as e:
+            logger.warning(f"Deep link failed ({e}), falling back to the button path")
+            await page.goto(self.challenge_url, wait_until="domcontentloaded")
+            return False
+
+    @metric_span("navigate_hidden_path")
+    async def navigate_hidden_path(self, page: Page) -> bool:
+        """Navigate through the hidden path to access product table, trying the recorded deep link first."""
+        try:
+            if self.deep_link and await self.open_deep_link(page):
+                return True
+            logger.info("Navigating hidden path...")
+            for step, (role, name) in enumerate(self.buttons_path):
+                logger.info(f"Attempting to click button for: {name}")
+                if not await self.smart_click(page, role, name):
+                    if name == "Show Product Table":
+                        logger.info("Show Product Table button not found, continuing")
+                        break
+                    logger.error(f"Failed to click {name} button")
+                    return False
+                with self.condition_wait("navigation", replaced_seconds=1):
+                    try:
+                        await self._step_target(page, step).wait_for(state="visible", timeout=15000)
+                    except PlaywrightTimeoutError:
+                        logger.warning(f"Nothing appeared after clicking '{name}'")
+            try:
+                await page.wait_for_selector("table >> tbody tr", timeout=20000)
+                logger.info("Table found successfully")
+                if self.deep_link:
+                    self.record_deep_link(page.url)
+                return True
+            except PlaywrightTimeoutError:
+                logger.error("Table not found after navigation")
+                return False
+        except Exception as e:
+            logger.error(f"Navigation failed: {e}")
+            return False
+
+    async def get_scrollable_parent_selector(self, page: Page, table_selector: str = "table") -> str:
+        """Find the closest scrollable ancestor of the table."""
+        try:
+            return await page.evaluate(SCROLLABLE_PARENT_JS, table_selector)
+        except Exception:
+            return "body"
+
+    async def extract_table_schema(self, page: Page) -> Dict[str, Any]:
+        """Async counterpart of IdenUnifiedAutomation.extract_table_schema; partitions share the cache."""
+        key = self._schema_key(page)
+        if key in self.schema_cache:
+            return self.schema_cache[key]
+        return self._cache_schema(key, await page.evaluate(TABLE_SCHEMA_JS))
+
+    async def extract_headers(self, page: Page) -> List[str]:
+        """Extract table headers (Column_N names when the table has no header row)."""
+        try:
+            return list((await self.extract_table_schema(page))["headers"])
+        except Exception:
+            return []
+
+    async def _scroll_step(self, page: Page, container, scroll_container: str, viewports: float = 5,
+                           clamp_to_rendered: bool = False) -> float:
+        """Advance the scroll container; returns the new position as a fraction of the scroll height."""
+        try:
+            self.count_round_trip()
+            return await container.first.evaluate(SCROLL_STEP_JS, {"viewports": viewports, "clamp": clamp_to_rendered})
+        except Exception:
+            return 0.0
+
+    async def wait_for_new_rows(self, page: Page, timeout_ms: int = 2000) -> bool:
+        """Wait until a row appears that has not been harvested yet."""
+        try:
+            self.count_round_trip()
+            await page.wait_for_function(WAIT_FOR_NEW_ROWS_JS, timeout=timeout_ms, polling=100)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    async def iter_table_tuples(self, page: Page, target_count: Optional[int] = None,
+                                harvest_mode: str = "final", key_column: Optional[str] = None,
+                                partition: Optional[Tuple[float, float]] = None) -> AsyncIterator[Tuple[Any, ...]]:
+        """Async counterpart of IdenUnifiedAutomation.iter_table_tuples."""
+        logger.info(f"Starting DOM-only infinite scroll extraction (mode: {harvest_mode})")
+        await page.wait_for_selector("table", state="visible")
+        scroll_container = await self.get_scrollable_parent_selector(page, "table")
+        container = page.locator(scroll_container)
+        await container.first.scroll_into_view_if_needed()
+        await page.wait_for_timeout(1000)
+
+        headers = await self.extract_headers(page)
+        self.table_headers = headers
+        if partition and scroll_container == "body":
+            # The window scroller cannot be positioned per partition: the first context takes the whole table
+            if partition[0] > 0:
+                logger.warning("Table scrolls with the page and cannot be partitioned, leaving it to the first context")
+                return
+            logger.warning("Table scrolls with the page and cannot be partitioned, harvesting all of it")
+            partition = None
+        if partition:
+            harvest_mode = "observer" if harvest_mode == "observer" else "incremental"
+            await container.first.evaluate("(el, f) => { el.scrollTop = el.scrollHeight * f; }", partition[0])
+            logger.info(f"Harvesting partition {partition[0]:.2f}-{partition[1]:.2f} of the table")
+        if harvest_mode in ("incremental", "observer"):
+            async for row in self._harvest_while_scrolling(page, headers, container, scroll_container,
+                                                           target_count, key_column,
+                                                           use_observer=harvest_mode == "observer",
+                                                           stop_fraction=partition[1] if partition else None):
+                yield row
+            return
+
+        controller = self.new_scroll_controller(viewports=5)
+        stagnant_rounds = 0
+        max_stagnant = 3
+        next_progress = 100
+        rows = page.locator("table tbody tr")
+        while stagnant_rounds < max_stagnant:
+            round_start = time.time()
+            self.count_round_trip()
+            current_count = await rows.count()
+            if target_count and current_count >= target_count:
+                break
+            if current_count >= next_progress:
+                logger.info(f"Progress: {current_count} rows extracted")
+                next_progress = (current_count // 100 + 1) * 100
+            await self._scroll_step(page, container, scroll_container, viewports=controller.viewports)
+            wait_start = time.time()
+            try:
+                self.count_round_trip()
+                await page.wait_for_function(
+                    f"document.querySelectorAll('table tbody tr').length > {current_count}",
+                    timeout=controller.wait_ms
+                )
+            except PlaywrightTimeoutError:
+                pass
+            latency_ms = (time.time() - wait_start) * 1000
+            self.count_round_trip()
+            new_count = await rows.count()
+            controller.record(new_count - current_count, latency_ms, new_count > current_count)
+            self.record_scroll_round(time.time() - round_start, new_count - current_count,
+                                     new_count > current_count)
+            stagnant_rounds = stagnant_rounds + 1 if new_count == current_count else 0
+            if target_count and new_count >= target_count:
+                break
+        self.scroll_stats = controller.summary()
+        # Only the rows still rendered are read below; on a virtualized table that is a window, not the table
+        self.harvest_complete = False
+
+        raw_rows = await page.eval_on_selector_all(
+            "table tbody tr", "els => els.map(tr => Array.from(tr.cells, td => td.innerText.trim()))"
+        )
+        logger.info(f" Scraped {len(raw_rows)} rows")
+        for row_cells in raw_rows:
+            yield self._normalize_cells(headers, row_cells)
+
+    async def _harvest_while_scrolling(self, page: Page, headers: List[str], container, scroll_container: str,
+                                       target_count: Optional[int], key_column: Optional[str],
+                                       use_observer: bool = False,
+                                       stop_fraction: Optional[float] = None) -> AsyncIterator[Tuple[Any, ...]]:
+        """Async counterpart of IdenUnifiedAutomation._harvest_while_scrolling."""
+        key_index = self._resolve_key_index(headers, key_column)
+        if use_observer:
+            try:
+                use_observer = bool(await page.evaluate(INSTALL_ROW_OBSERVER_JS))
+            except Exception as e:
+                logger.warning(f"Failed to install row observer: {e}")
+                use_observer = False
+            if not use_observer:
+                logger.warning("Row observer unavailable, falling back to per-step harvesting")
+
+        harvested = 0
+        position = 0.0
+        seen_keys: Set[Any] = set()
+        stagnant_rounds = 0
+        max_stagnant = 3
+        next_progress = 100
+        controller = self.new_scroll_controller(viewports=1)
+
+        ingest = self._row_ingester(headers, key_index, seen_keys)
+
+        def drain_args(viewports: float, timeout_ms: int) -> Dict[str, Any]:
+            return {"sel": scroll_container, "viewports": viewports,
+                    "timeout": timeout_ms, "clamp": controller.adaptive}
+
+        while stagnant_rounds < max_stagnant:
+            round_start = time.time()
+            self.count_round_trip()
+            if use_observer:
+                step = await page.evaluate(DRAIN_OBSERVED_ROWS_JS, drain_args(controller.viewports, controller.wait_ms))
+                fresh = ingest(step["rows"])
+                grew, latency_ms, position = step["grew"], step["latency"], step["position"]
+            else:
+                fresh = ingest(await page.evaluate(HARVEST_ROWS_JS))
+            round_seconds = time.time() - round_start
+            for row in fresh:
+                if target_count and harvested >= target_count:
+                    break
+                harvested += 1
+                yield row
+            if target_count and harvested >= target_count:
+                break
+            if stop_fraction is not None and stop_fraction < 1 and position >= stop_fraction:
+                break
+
+            if harvested >= next_progress:
+                logger.info(f"Progress: {harvested} rows harvested")
+                next_progress = (harvested // 100 + 1) * 100
+
+            if not use_observer:
+                scroll_start = time.time()
+                position = await self._scroll_step(page, container, scroll_container,
+                                                   viewports=controller.viewports,
+                                                   clamp_to_rendered=controller.adaptive)
+                wait_start = time.time()
+                grew = await self.wait_for_new_rows(page, timeout_ms=controller.wait_ms)
+                latency_ms = (time.time() - wait_start) * 1000
+                round_seconds += time.time() - scroll_start
+            controller.record(len(fresh), latency_ms, grew)
+            self.record_scroll_round(round_seconds, len(fresh), grew)
+            stagnant_rounds = 0 if grew else stagnant_rounds + 1
+        self.scroll_stats = controller.summary()
+        self.harvest_complete = stagnant_rounds >= max_stagnant
+
+        if use_observer and not (target_count and harvested >= target_count):
+            self.count_round_trip()
+            step = await page.evaluate(DRAIN_OBSERVED_ROWS_JS, drain_args(0, 0))
+            for row in ingest(step["rows"]):
+                if target_count and harvested >= target_count:
+                    break
+                harvested += 1
+                yield row
+
+        logger.info(f" Harvested {harvested} unique rows")
+
+    async def scroll_table(self, page: Page, target_count: Optional[int] = None,
+                           harvest_mode: str = "final", key_column: Optional[str] = None,
+                           partition: Optional[Tuple[float, float]] = None) -> ProductTable:
+        """Extract all table data into a compact ProductTable."""
+        table = ProductTable([])
+        try:
+            async for cells in self.iter_table_tuples(page, target_count=target_count, harvest_mode=harvest_mode,
+                                                      key_column=key_column, partition=partition):
+                table.append(cells)
+        except Exception as e:
+            logger.error(f"Error in infinite_scroll_table: {e}")
+            return ProductTable([])
+        table.headers = tuple(self.table_headers)
+        return table
+
+    async def iter_product_data(self, target_count: int = 2332) -> AsyncIterator[Dict]:
+        """Yield cleaned products as soon as they are harvested from the table."""
+        logger.info("Starting data extraction...")
+        async for cells in self.iter_table_tuples(self.page, target_count=target_count,
+                                                  harvest_mode=self.harvest_mode, key_column=self.key_column):
+            yield self._clean_timed(dict(zip(self.table_headers, cells)))
+
+    async def extract_product_table(self, target_count: int = 2332) -> ProductTable:
+        """Extract product data into a compact ProductTable."""
+        logger.info("Starting data extraction...")
+        table = await self.scroll_table(self.page, target_count=target_count,
+                                        harvest_mode=self.harvest_mode, key_column=self.key_column)
+        logger.info(f"Total extracted: {len(table)}")
+        return table
+
+    async def extract_product_data(self, target_count: int = 2332) -> List[Dict]:
+        """Extract product data using efficient infinite scroll strategy."""
+        return (await self.extract_product_table(target_count=target_count)).to_dicts()
+
+    async def _extract_partition(self, partition: Tuple[float, float]) -> Optional[ProductTable]:
+        """Harvest one scroll partition in its own context of the shared browser."""
+        context = None
+        try:
+            context, page, valid = await self._open_restored_page()
+            if not valid:
+                logger.error(f"Partition {partition}: saved session could not be restored")
+                return None
+            if self.call_tracer:
+                page = self.call_tracer.trace(page)
+            if not await self.navigate_hidden_path(page):
+                logger.error(f"Partition {partition}: navigation failed")
+                return None
+            return await self.scroll_table(page, harvest_mode=self.harvest_mode,
+                                           key_column=self.key_column, partition=partition)
+        except Exception as e:
+            logger.error(f"Partition {partition} failed: {e}")
+            return None
+        finally:
+            if context:
+                await context.close()
+
+    async def extract_product_data_parallel(self, workers: int, target_count: int = 2332,
+                                            headless: bool = False) -> ProductTable:
+        """
+        Harvest equal scroll partitions concurrently in N contexts of one browser, all restored
+        from the saved session and driven from a single event loop, then merge and dedupe.
+        """
+        logger.info(f"Starting parallel extraction with {workers} contexts...")
+        partitions = [(i / workers, (i + 1) / workers) for i in range(workers)]
+        results: Dict[Tuple[float, float], Optional[ProductTable]] = {}
+        pending = partitions
+        for attempt in range(2):
+            for part, table in zip(pending, await asyncio.gather(*(self._extract_partition(p) for p in pending))):
+                results[part] = table
+            pending = [part for part in partitions if results[part] is None or not results[part].headers]
+            if not pending:
+                break
+            if not attempt:
+                logger.warning(f"{len(pending)} of {workers} partitions failed, retrying them")
+        if pending:
+            # Exporting the other partitions would silently drop a slice of the table
+            raise Exception(f"{len(pending)} of {workers} partitions failed, table would be incomplete")
+        tables = [results[part] for part in partitions]
+
+        return self._merge_partitions(tables, target_count)
+
+    async def export_stream_async(self, rows: AsyncIterator[Dict], fmt: str = "ndjson", batch_size: int = 100) -> int:
+        """
+        Stream rows to the output file while harvesting continues: each batch is written
+        in a worker thread, with at most one write in flight so order is preserved.
+        """
+        loop = asyncio.get_running_loop()
+        count = 0
+        batch: List[str] = [self._stream_header(fmt)]
+        pending = None
+        with open(self.output_file, "w", encoding="utf-8") as f:
+            def write(text: str) -> None:
+                f.write(text)
+                f.flush()
+
+            try:
+                async for row in rows:
+                    batch.append(self._stream_line(row, count, fmt))
+                    count += 1
+                    if count % batch_size == 0:
+                        if pending:
+                            await pending
+                        pending = loop.run_in_executor(None, write, "".join(batch))
+                        batch = []
+            except Exception as e:
+                logger.error(f"Extraction failed while streaming after {count} rows: {e}")
+                raise
+            finally:
+                # Keep what was already written and still close the document before a failure propagates
+                batch.append(self._stream_footer(count, fmt))
+                if pending:
+                    await pending
+                await loop.run_in_executor(None, write, "".join(batch))
+        logger.info(f"Streamed {count} products to {self.output_file} ({fmt})")
+        return count
+
+    async def check_session_status(self) -> Dict[str, Any]:
+        """Check current session status for debugging."""
+        try:
+            if not self.context:
+                return {"status": "no_context", "cookies": 0, "localStorage": 0}
+            cookies = await self.context.cookies()
+            try:
+                local_storage_count = await self.page.evaluate("() => Object.keys(localStorage).length") if self.page else 0
+            except Exception:
+                local_storage_count = 0
+            return {
+                "status": "active",
+                "cookies": len(cookies),
+                "localStorage": local_storage_count,
+                "cookie_names": [c.get("name", "") for c in cookies[:5]],
+                "url": self.page.url if self.page else "no_page"
+            }
+        except Exception as e:
+            return {"status": "error", "error": str(e), "cookies": 0, "localStorage": 0, "cookie_names": []}
+
+    async def print_session_info(self, after: str = "check"):
+        """Unified method to load and display session information."""
+        session_status = await self.check_session_status()
+        session_data = self.session_store.session_storage or None
+        if session_data:
+            if after == "login":
+                print(f"Saved {len(session_data)} sessionStorage keys")
+            elif after == "restore":
+                print(f"SessionStorage: {len(session_data)} keys restored")
+        elif after == "login":
+            print("Failed to save sessionStorage")
+        elif after == "restore":
+            print("No sessionStorage file found")
+        self.show_session_summary(session_status, session_data)
+
+    async def cleanup_browser_resources(self):
+        """Clean up browser resources. When attached to the daemon, only our own page is closed."""
+        if self.traced_context is not None and self.traced_context is self.context:
+            try:
+                await self.context.tracing.stop(path=self.playwright_trace)
+                print(f"Playwright trace written to {self.playwright_trace} (open with: playwright show-trace)")
+            except Exception as e:
+                logger.warning(f"Failed to save Playwright trace: {e}")
+        try:
+            if self.page and not self.page.is_closed():
+                await self.page.close()
+            # Leave the daemon's context and browser running; stopping the driver just disconnects
+            if not self.attached:
+                if self.context:
+                    await self.context.close()
+                if self.browser:
+                    await self.browser.close()
+            if self.pw:
+                await self.pw.stop()
+            logger.info("Browser resources cleaned up")
+        except Exception as e:
+            logger.warning(f"Cleanup failed: {e}")
+
+    async def run(self, headless: bool = False, target_count: int = 2332) -> bool:
+        """Main execution method. Returns the number of products exported, or False on failure."""
+        start_time = time.time()
+        self.target_count = target_count
+        self.headless = headless
+        loop = asyncio.get_running_loop()
+        try:
+            print("Starting Iden Challenge Unified Automation (async engine)")
+            logger.info("Starting Iden Challenge Unified Automation (async engine)")
+            # Refuse rather than quietly run another engine or start over (main() rejects these too)
+            if self.engine == "network":
+                raise Exception("The network engine is only available in the sync engine")
+            if self.checkpoint or self.resume:
+                raise Exception("Checkpoint/resume is only available in the sync engine")
+            if self.account_pool:
+                # Parallel contexts share this account's session; the pool rotates it across runs
+                await loop.run_in_executor(None, self._acquire_pool_account, headless)
+
+            print("\nCHECKING EXISTING SESSION FILES")
+            self.show_detailed_session_info()
+
+            if self.replay:
+                print("Replaying saved API requests without a browser...")
+                with self.timed_phase("http_replay"):
+                    products = await loop.run_in_executor(None, self.extract_via_http_replay, target_count)
+                if products:
+                    print(f"Extracted {len(products)} products")
+                    with self.timed_phase("export"):
+                        product_count = await loop.run_in_executor(None, self.export_products, products)
+                    if not product_count:
+                        raise Exception("Export failed")
+                    execution_time = time.time() - start_time
+                    print(f"Automation completed successfully in {execution_time:.1f} seconds")
+                    print(f"Performance: {product_count/execution_time:.1f} products/second")
+                    self.print_phase_report()
+                    self.record_run_result(product_count)
+                    return product_count
+                print("HTTP replay unavailable, falling back to browser extraction")
+
+            print("Setting up browser...")
+            session_reused = await self.setup_browser(headless)
+            self.trace_page()
+
+            if not self.credentials["username"] or not self.credentials["password"]:
+                raise Exception("Invalid credentials provided")
+
+            if session_reused:
+                print("Using existing session - skipping authentication")
+                logger.info("Using existing session - skipping authentication")
+                await self.print_session_info(after="restore")
+            else:
+                print("Starting authentication process")
+                with self.timed_phase("authentication"):
+                    authenticated = await self.authenticate()
+                if not authenticated:
+                    raise Exception("Authentication failed")
+                print("Authentication successful!")
+                await self.print_session_info(after="login")
+
+            parallel = self.workers > 1
+            if parallel:
+                print(f"Using {self.workers} parallel contexts for extraction")
+            else:
+                print("Navigating to product table")
+                with self.timed_phase("navigation"):
+                    navigated = await self.navigate_hidden_path(self.page)
+                if not navigated:
+                    raise Exception("Navigation failed")
+                print("Navigation successful!")
+
+            print(f"Extracting product data (target: {target_count} products)")
+            if self.delta_from:
+                # The diff runs after harvesting here, so --delta-stop-after does not save scrolling.
+                # Final mode reads only the rows rendered at the end, so harvest per step
+                if self.harvest_mode == "final":
+                    logger.info("Delta extraction harvests on every scroll step (final mode becomes incremental)")
+                    self.harvest_mode = "incremental"
+                # One phase for harvest and diff, as in the sync engine where they are interleaved
+                with self.timed_phase("extraction_delta"):
+                    if parallel:
+                        products = await self.extract_product_data_parallel(self.workers, target_count=target_count)
+                    else:
+                        products = await self.extract_product_table(target_count=target_count)
+                    delta_count = await loop.run_in_executor(None, self.export_delta, products)
+                execution_time = time.time() - start_time
+                print(f"Automation completed successfully in {execution_time:.1f} seconds")
+                self.print_phase_report()
+                self.metrics.set("delta_rows", delta_count)
+                self.record_run_result(max(delta_count, 1))
+                return max(delta_count, 1)
+            if parallel:
+                with self.timed_phase("extraction"):
+                    products = await self.extract_product_data_parallel(self.workers, target_count=target_count)
+            elif self.output_format in STREAMING_FORMATS:
+                # Rows are written in a worker thread while the page keeps scrolling
+                print(f"Exporting data ({self.output_format})")
+                with self.timed_phase("extraction_export"):
+                    product_count = await self.export_stream_async(
+                        self.iter_product_data(target_count=target_count), fmt=self.output_format
+                    )
+                products = None
+            else:
+                with self.timed_phase("extraction"):
+                    products = await self.extract_product_table(target_count=target_count)
+
+            if products is not None:
+                if not products:
+                    raise Exception("Data extraction failed")
+                print(f"Extracted {len(products)} products")
+                print(f"Exporting data ({self.output_format})")
+                with self.timed_phase("export"):
+                    product_count = await loop.run_in_executor(None, self.export_products, products)
+            if not product_count:
+                raise Exception("Data extraction failed")
+
+            execution_time = time.time() - start_time
+            print(f"Automation completed successfully in {execution_time:.1f} seconds")
+            print(f"Performance: {product_count/execution_time:.1f} products/second")
+            logger.info(f"Automation completed successfully in {execution_time:.1f} seconds")
+            self.print_phase_report()
+            self.show_detailed_session_info()
+            self.record_run_result(product_count)
+            return product_count
+
+        except Exception as e:
+            error_msg = f"Automation failed: {e}"
+            print(f"{error_msg}")
+            logger.error(error_msg)
+            self.record_run_result(0)
+            return False
+
+        finally:
+            self.report_call_trace()
+            await loop.run_in_executor(None, self.write_metrics, time.time() - start_time)
+            if self.account_pool:
+                self._release_pool_account()
+                # Joins the refresher thread, so keep it off the event loop
+                await loop.run_in_executor(None, self.account_pool.stop_refresher)
+            await self.cleanup_browser_resources()
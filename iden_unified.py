@@ -11,24 +11,273 @@ This script:
 5. Exports data to structured JSON format
 """
 
+import base64
+import gzip
+import hashlib
+import http.client
+import inspect
 import json
 import os
+import threading
 import time
 import re
-from typing import Dict, List, Optional, Any, Set, Tuple
+import sys
+import tempfile
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple, Iterable, Iterator, Sequence, Union
 import logging
 from pathlib import Path
 import argparse
+import asyncio
+import csv
+import functools
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urljoin, urlparse, parse_qs, urlencode, urlunparse
 from playwright.sync_api import sync_playwright, Page, Browser, BrowserContext, TimeoutError as PlaywrightTimeoutError
 from dotenv import load_dotenv
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: only needed for --output-format parquet/arrow
+    pa = None
+    pq = None
+
 # Load environment variables
 load_dotenv()
 
 # Configuration constants
-LOGIN_URL = "https://hiring.idenhq.com/"
-CHALLENGE_URL = "https://hiring.idenhq.com/challenge"
+# Overridable (e.g. to point at mock_iden_server.py); instances copy them into login_url / challenge_url
+LOGIN_URL = os.getenv("IDEN_LOGIN_URL", "https://hiring.idenhq.com/")
+CHALLENGE_URL = os.getenv("IDEN_CHALLENGE_URL", urljoin(LOGIN_URL, "challenge"))
 SESSION_FILE = "session.json"
+SESSION_DIR = "sessions"
+API_TEMPLATE_FILE = "api_template.json"
+# Retries of a replayed API page that failed with 429 or 5xx, before falling back to the browser
+REPLAY_RETRIES = 3
+CHECKPOINT_FILE = "extraction_checkpoint.json"
+DEEP_LINK_FILE = "deep_link.json"
+BROWSER_ENDPOINT_FILE = "browser_endpoint.json"
+BROWSER_PROFILE_DIR = "browser_profile"
+BROWSER_ARGS = ['--no-sandbox', '--disable-dev-shm-usage']
+# Resource types dropped by each --block-resources profile; BLOCKED_HOSTS are dropped by any profile but "off"
+BLOCK_PROFILES = {
+    "off": (),
+    "standard": ("image", "media", "font"),
+    "aggressive": ("image", "media", "font", "stylesheet"),
+}
+# Analytics and ad hosts (and their subdomains); other third-party hosts may serve the app's own scripts and APIs
+BLOCKED_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "googleadservices.com", "facebook.net", "hotjar.com", "segment.io", "segment.com", "mixpanel.com",
+    "amplitude.com", "fullstory.com", "clarity.ms", "adnxs.com", "criteo.com", "taboola.com", "outbrain.com",
+)
+# Treat tokens as expired this many seconds early, to absorb clock skew and in-flight requests
+EXPIRY_SKEW_SECONDS = 30
+JWT_PATTERN = re.compile(r"eyJ[\w-]*\.eyJ[\w-]*\.[\w-]*")
+EXPIRY_FIELDS = ("expires_at", "expiresAt", "expiry", "exp")
+STREAMING_FORMATS = ("ndjson", "json-stream")
+COLUMNAR_FORMATS = ("csv", "parquet", "arrow")
+OUTPUT_EXTENSIONS = {"json": ".json", "ndjson": ".ndjson", "json-stream": ".json",
+                     "csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%b %d, %Y", "%d %b %Y")
+DATETIME_FORMATS = ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f",
+                    "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M")
+
+# In-page scripts, shared by the sync engine here and the async engine in iden_async.py
+SCROLLABLE_PARENT_JS = """
+(sel) => {
+    const el = document.querySelector(sel);
+    if (!el) return "body";
+    function isScrollable(node) {
+        const style = window.getComputedStyle(node);
+        const overflowY = style.overflowY;
+        const canScroll = node.scrollHeight > node.clientHeight + 2;
+        return canScroll && (overflowY === 'auto' || overflowY === 'scroll');
+    }
+    let p = el.parentElement;
+    while (p && p !== document.body) {
+        if (isScrollable(p)) {
+            if (p.id) return '#' + p.id;
+            if (p.className && typeof p.className === 'string') {
+                const firstClass = p.className.trim().split(/\\s+/)[0];
+                if (firstClass) return p.tagName.toLowerCase() + '.' + firstClass;
+            }
+            return p.tagName.toLowerCase();
+        }
+        p = p.parentElement;
+    }
+    return "body";
+}
+"""
+
+SCROLL_STEP_JS = """
+(el, opts) => {
+    // A table that scrolls with the page moves the window, one innerHeight per viewport
+    const page = el === document.body || el === document.documentElement;
+    let step = (page ? window.innerHeight : el.clientHeight) * opts.viewports;
+    if (opts.clamp) {
+        const rows = el.querySelectorAll('table tbody tr');
+        if (rows.length) {
+            const top = page ? 0 : el.getBoundingClientRect().top;
+            const below = rows[rows.length - 1].getBoundingClientRect().bottom - top;
+            step = Math.min(step, Math.max(below, 1));
+        }
+    }
+    if (page) {
+        window.scrollBy(0, step);
+        return window.scrollY / Math.max(document.documentElement.scrollHeight, 1);
+    }
+    el.scrollTop += step;
+    return el.scrollTop / Math.max(el.scrollHeight, 1);
+}
+"""
+
+TABLE_SCHEMA_JS = """
+() => {
+    const headers = Array.from(document.querySelectorAll('table thead th'), th => th.innerText.trim());
+    const firstRow = document.querySelector('table tbody tr');
+    const rowCells = firstRow ? firstRow.cells.length : 0;
+    return {headers, columnCount: headers.length || rowCells, rowCells};
+}
+"""
+
+HARVEST_ROWS_JS = """
+() => {
+    const seen = window.__idenHarvestSeen || (window.__idenHarvestSeen = new WeakMap());
+    const fresh = [];
+    for (const tr of document.querySelectorAll('table tbody tr')) {
+        const text = tr.textContent;
+        if (seen.get(tr) === text) continue;
+        seen.set(tr, text);
+        fresh.push(Array.from(tr.cells, td => td.innerText.trim()));
+    }
+    return fresh;
+}
+"""
+
+WAIT_FOR_NEW_ROWS_JS = """
+() => {
+    const seen = window.__idenHarvestSeen;
+    if (!seen) return true;
+    for (const tr of document.querySelectorAll('table tbody tr')) {
+        if (seen.get(tr) !== tr.textContent) return true;
+    }
+    return false;
+}
+"""
+
+INSTALL_ROW_OBSERVER_JS = """
+() => {
+    if (window.__idenRowObserver) return true;
+    const table = document.querySelector('table');
+    if (!table) return false;
+    const pending = new Set();
+    const enqueue = (node) => {
+        const el = node.nodeType === 1 ? node : node.parentElement;
+        if (!el) return;
+        const tr = el.closest('tbody tr');
+        if (tr) { pending.add(tr); return; }
+        if (el.querySelectorAll) el.querySelectorAll('tbody tr').forEach(r => pending.add(r));
+    };
+    table.querySelectorAll('tbody tr').forEach(tr => pending.add(tr));
+    const observer = new MutationObserver((mutations) => {
+        for (const m of mutations) {
+            if (m.type === 'childList') m.addedNodes.forEach(enqueue);
+            else enqueue(m.target);
+        }
+        if (pending.size && window.__idenRowWaiter) window.__idenRowWaiter();
+    });
+    observer.observe(table, {childList: true, subtree: true, characterData: true});
+    window.__idenRowObserver = {observer, pending};
+    return true;
+}
+"""
+
+DRAIN_OBSERVED_ROWS_JS = """
+async ({sel, viewports, timeout, clamp}) => {
+    const state = window.__idenRowObserver;
+    if (!state) return {rows: [], grew: false, latency: 0, position: 0};
+    const rows = [];
+    for (const tr of state.pending) {
+        if (tr.isConnected) rows.push(Array.from(tr.cells, td => td.innerText.trim()));
+    }
+    state.pending.clear();
+    let position = 0;
+    if (viewports > 0) {
+        const scroller = sel === 'body' ? document.body : document.querySelector(sel);
+        if (scroller) position = (__SCROLL_STEP__)(scroller, {viewports, clamp});
+    }
+    const started = performance.now();
+    if (timeout > 0 && !state.pending.size) {
+        await new Promise((resolve) => {
+            const timer = setTimeout(resolve, timeout);
+            window.__idenRowWaiter = () => { clearTimeout(timer); resolve(); };
+        });
+        window.__idenRowWaiter = null;
+        // Let the rest of the batch render before the next drain
+        await new Promise((resolve) => requestAnimationFrame(() => resolve()));
+    }
+    return {rows, grew: state.pending.size > 0, latency: performance.now() - started, position};
+}
+""".replace("__SCROLL_STEP__", SCROLL_STEP_JS.strip())
+
+AUTH_DATA_PRESENT_JS = """
+() => {
+                    // Check if we have any cookies
+                    if (document.cookie && document.cookie.length > 0) return true;
+
+                    // Check if we have any localStorage items
+                    if (Object.keys(localStorage).length > 0) return true;
+
+                    // Check if we have any sessionStorage items
+                    if (Object.keys(sessionStorage).length > 0) return true;
+
+                    // Check for specific auth-related keys
+                    if (localStorage.getItem("authToken") !== null) return true;
+                    if (localStorage.getItem("session") !== null) return true;
+                    if (localStorage.getItem("token") !== null) return true;
+
+                    return false;
+                }
+"""
+
+# Page URL, sessionStorage keys and auth tokens (JWTs, as the session code detects them) just before login submits
+LOGIN_STATE_JS = """
+() => ({
+    url: location.href,
+    keys: Object.keys(sessionStorage),
+    tokens: [...Object.values(sessionStorage), ...Object.values(localStorage)].filter((v) => /__JWT__/.test(v)),
+})
+""".replace("__JWT__", JWT_PATTERN.pattern)
+
+# Login has settled once the page navigated, a sessionStorage key appeared or a new auth token was stored,
+# compared with the LOGIN_STATE_JS snapshot (leaving the configured login URL proves nothing on its own)
+LOGIN_SETTLED_JS = """
+({url, keys, tokens}) => {
+    if (location.href !== url) return true;
+    const knownKeys = new Set(keys);
+    if (Object.keys(sessionStorage).some((k) => !knownKeys.has(k))) return true;
+    const knownTokens = new Set(tokens);
+    return [...Object.values(sessionStorage), ...Object.values(localStorage)]
+        .some((v) => /__JWT__/.test(v) && !knownTokens.has(v));
+}
+""".replace("__JWT__", JWT_PATTERN.pattern)
+
+SESSION_STORAGE_JS = "() => Object.entries(sessionStorage).reduce((obj,[k,v]) => (obj[k]=v,obj), {})"
+LOCAL_STORAGE_JS = "() => Object.entries(localStorage).reduce((obj,[k,v]) => (obj[k]=v,obj), {})"
+
+# Init script restoring saved sessionStorage before any page script runs; only on the app's
+# origin, and only for keys the page does not already have (so fresh tokens are never overwritten)
+RESTORE_SESSION_STORAGE_JS = """
+(({origin, items}) => {
+    if (location.origin !== origin) return;
+    for (const [k, v] of Object.entries(items)) {
+        if (sessionStorage.getItem(k) === null) sessionStorage.setItem(k, v);
+    }
+})
+"""
 
 # Configure logging
 logging.basicConfig(
@@ -39,21 +288,927 @@ logger = logging.getLogger(__name__)
 
 
 
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = 2) -> None:
+    """Write JSON to a temp file next to path and rename it over path, so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def session_restore_script(session_storage: Dict[str, Any], url: str) -> str:
+    """Init script source that restores session_storage on url's origin; values are passed as JSON, not spliced into JS."""
+    parsed = urlparse(url)
+    payload = {
+        "origin": f"{parsed.scheme}://{parsed.netloc}",
+        "items": {k: v if isinstance(v, str) else json.dumps(v) for k, v in session_storage.items()},
+    }
+    return f"{RESTORE_SESSION_STORAGE_JS.strip()}({json.dumps(payload)})"
+
+
+def token_expiry(values: Iterable[Any]) -> Optional[float]:
+    """
+    Earliest expiry (epoch seconds) found in saved storage values: the exp claim of any JWT,
+    or an expiry field of a JSON object value. None when no value carries an expiry.
+    """
+    expiries = []
+    for value in values:
+        text = value if isinstance(value, str) else json.dumps(value)
+        for token in JWT_PATTERN.findall(text):
+            payload = token.split(".")[1]
+            try:
+                claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            except ValueError:
+                continue
+            if isinstance(claims, dict) and isinstance(claims.get("exp"), (int, float)):
+                expiries.append(float(claims["exp"]))
+        try:
+            data = json.loads(text)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            for field in EXPIRY_FIELDS:
+                expiry = data.get(field)
+                if isinstance(expiry, (int, float)) and expiry > 0:
+                    # Millisecond timestamps (JavaScript Date.now()) are converted to seconds
+                    expiries.append(expiry / 1000 if expiry > 1e11 else float(expiry))
+                    break
+    return min(expiries) if expiries else None
+
+
+def read_browser_endpoint(path: str = BROWSER_ENDPOINT_FILE) -> Optional[str]:
+    """CDP endpoint of a running --serve-browser daemon, or None if none is advertised."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("endpoint")
+    except (OSError, ValueError):
+        return None
+
+
+class ExtractionCheckpoint:
+    """
+    Checkpoint of an in-progress extraction: harvested rows are appended to an NDJSON log
+    on every scroll step, and a small metadata file (headers, row count, last scroll
+    position and row key) is replaced atomically at most every `interval` seconds.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_FILE, interval: float = 2.0):
+        self.path = path
+        self.rows_path = os.path.splitext(path)[0] + ".ndjson"
+        self.interval = interval
+        self.meta: Dict[str, Any] = {}
+        self._rows_file = None
+        self._last_write = 0.0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path) and os.path.exists(self.rows_path)
+
+    def load(self) -> Tuple[Dict[str, Any], List[Tuple[Any, ...]]]:
+        """
+        Read the metadata and every row line. A torn last line (from a crash mid-write) is
+        ignored; an unreadable line anywhere else is skipped with a warning.
+        """
+        with open(self.path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(self.rows_path, "r", encoding="utf-8") as f:
+            lines = f.read().split("\n")
+        rows = []
+        # The text after the last newline is empty unless the last write was torn
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(tuple(json.loads(line)))
+            except ValueError:
+                if number == len(lines):
+                    logger.info(f"Ignoring a torn last line in {self.rows_path}")
+                else:
+                    logger.warning(f"Skipping unreadable row on line {number} of {self.rows_path}")
+        return meta, rows
+
+    def _truncate_torn_line(self) -> None:
+        """Cut a partial last line left by a crash, so appended rows start on a line of their own."""
+        with open(self.rows_path, "r+b") as f:
+            end = position = f.seek(0, os.SEEK_END)
+            while position > 0:
+                step = min(4096, position)
+                f.seek(position - step)
+                newline = f.read(step).rfind(b"\n")
+                if newline >= 0:
+                    position = position - step + newline + 1
+                    break
+                position -= step
+            if position < end:
+                logger.warning(f"Dropping a torn last line ({end - position} bytes) from {self.rows_path}")
+                f.truncate(position)
+
+    def start(self, headers: List[str], resume: bool = False, meta: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Open the row log, appending to it when resuming. Pass the metadata from load() as meta
+        to avoid reading the checkpoint again.
+        """
+        self.meta = {"headers": headers, "rows": 0, "position": 0.0, "last_key": None}
+        if resume and self.exists():
+            if meta is None:
+                meta = self.load()[0]
+            self.meta.update(meta)
+            self._truncate_torn_line()
+        self._rows_file = open(self.rows_path, "a" if resume else "w", encoding="utf-8")
+
+    def append(self, rows: List[Tuple[Any, ...]]) -> None:
+        if not self._rows_file or not rows:
+            return
+        self._rows_file.write("".join(json.dumps(list(row), ensure_ascii=False) + "\n" for row in rows))
+        self._rows_file.flush()
+        self.meta["rows"] += len(rows)
+
+    def update(self, force: bool = False, **meta: Any) -> None:
+        """Record progress; the metadata file is rewritten at most once per interval unless forced."""
+        self.meta.update(meta)
+        if force or time.time() - self._last_write >= self.interval:
+            self.meta["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            atomic_write_json(self.path, self.meta)
+            self._last_write = time.time()
+
+    def close(self) -> None:
+        if self._rows_file:
+            self.update(force=True)
+            self._rows_file.close()
+            self._rows_file = None
+
+    def clear(self) -> None:
+        """Remove the checkpoint after a successful export."""
+        if self._rows_file:
+            self._rows_file.close()
+            self._rows_file = None
+        for path in (self.path, self.rows_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class SessionStore:
+    """
+    All saved session state in one file: Playwright storage state (cookies, localStorage),
+    the page's sessionStorage (where the auth tokens live) and localStorage, plus when it was
+    saved and when the auth tokens and cookies expire. Loaded once per run and kept in memory,
+    written atomically. Older runs kept these in session.json, session_storage.json and
+    local_storage.json; those are migrated on first load of the default SESSION_FILE store
+    only, so a pooled account's store never picks up another account's legacy tokens.
+    """
+
+    LEGACY_FILES = ("session_storage.json", "local_storage.json")
+
+    def __init__(self, path: str = SESSION_FILE):
+        self.path = path
+        self.data: Dict[str, Any] = {}
+        self.read_only = False
+        self._loaded = False
+
+    def load(self) -> Dict[str, Any]:
+        if self._loaded:
+            return self.data
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if self._owns_legacy_files():
+            if data and "storage_state" not in data:
+                data = self._migrate(data)
+            elif not data and any(os.path.exists(p) for p in self.LEGACY_FILES):
+                data = self._migrate({})
+        self.data = data
+        return self.data
+
+    def _owns_legacy_files(self) -> bool:
+        """The legacy files belong to the single-account layout, i.e. the default session file."""
+        return os.path.abspath(self.path) == os.path.abspath(SESSION_FILE)
+
+    def _migrate(self, storage_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Fold the legacy storage-state file and the two storage dumps into the unified format."""
+        legacy = []
+        for path in self.LEGACY_FILES:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    legacy.append(json.load(f))
+            except (OSError, ValueError):
+                legacy.append({})
+        data = self._build(storage_state, legacy[0], legacy[1])
+        atomic_write_json(self.path, data)
+        self._remove_legacy_files()
+        logger.info(f"Migrated legacy session files into {self.path}")
+        return data
+
+    def _build(self, storage_state: Dict[str, Any], session_storage: Dict[str, Any],
+               local_storage: Dict[str, Any]) -> Dict[str, Any]:
+        # Session cookies report expires -1; the earliest real expiry bounds the login
+        expiries = [c["expires"] for c in storage_state.get("cookies", []) if c.get("expires", -1) > 0]
+        token_expires_at = token_expiry(list((session_storage or {}).values()) + list((local_storage or {}).values()))
+        if token_expires_at is not None:
+            expiries.append(token_expires_at)
+        return {
+            "saved_at": time.time(),
+            "expires_at": min(expiries) if expiries else None,
+            "token_expires_at": token_expires_at,
+            "storage_state": storage_state,
+            "session_storage": session_storage or {},
+            "local_storage": local_storage or {},
+        }
+
+    def _remove_legacy_files(self) -> None:
+        for path in self.LEGACY_FILES:
+            if os.path.exists(path):
+                os.remove(path)
+
+    @property
+    def storage_state(self) -> Dict[str, Any]:
+        return self.load().get("storage_state", {})
+
+    @property
+    def session_storage(self) -> Dict[str, Any]:
+        return self.load().get("session_storage", {})
+
+    @property
+    def local_storage(self) -> Dict[str, Any]:
+        return self.load().get("local_storage", {})
+
+    @property
+    def expires_at(self) -> Optional[float]:
+        return self.load().get("expires_at")
+
+    @property
+    def token_expires_at(self) -> Optional[float]:
+        """Expiry decoded from the saved tokens themselves, if they carry one."""
+        return self.load().get("token_expires_at")
+
+    def is_valid(self, margin: float = 0) -> bool:
+        """Saved sessionStorage present and no token or auth cookie expiring within margin seconds; no browser needed."""
+        if not self.session_storage:
+            return False
+        return self.expires_at is None or self.expires_at > time.time() + margin + EXPIRY_SKEW_SECONDS
+
+    def snapshot(self) -> "SessionStore":
+        """A read-only, in-memory copy for a worker: its save() and clear() never touch the shared file."""
+        copy = SessionStore(self.path)
+        copy.data = dict(self.load())
+        copy.read_only = True
+        copy._loaded = True
+        return copy
+
+    def save(self, storage_state: Dict[str, Any], session_storage: Dict[str, Any],
+             local_storage: Dict[str, Any]) -> None:
+        self.data = self._build(storage_state, session_storage, local_storage)
+        self._loaded = True
+        if not self.read_only:
+            atomic_write_json(self.path, self.data)
+
+    def clear(self) -> None:
+        self.data = {}
+        self._loaded = True
+        if self.read_only:
+            return
+        if os.path.exists(self.path):
+            os.remove(self.path)
+            logger.info(f"Removed invalid session file: {self.path}")
+        if self._owns_legacy_files():
+            self._remove_legacy_files()
+
+
+class AccountPool:
+    """
+    Several accounts, each with its own session store under session_dir, handed out to
+    concurrent workers one lease at a time. acquire() prefers idle accounts whose saved
+    session is still valid, least recently used first; accounts that fail max_failures
+    times in a row are retired. A background refresher re-authenticates idle accounts
+    whose sessions are about to expire.
+    """
+
+    def __init__(self, accounts: List[Dict[str, str]], session_dir: str = SESSION_DIR, max_failures: int = 3):
+        if not accounts:
+            raise ValueError("Account pool needs at least one account")
+        os.makedirs(session_dir, exist_ok=True)
+        self.accounts = [{
+            "credentials": {"username": a["username"], "password": a["password"]},
+            "store": SessionStore(os.path.join(session_dir, re.sub(r"[^\w.-]", "_", a["username"]) + ".json")),
+            "busy": False,
+            "last_used": 0.0,
+            "failures": 0,
+        } for a in accounts]
+        self.max_failures = max_failures
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_file(cls, path: str, session_dir: str = SESSION_DIR) -> "AccountPool":
+        """Load accounts from a JSON list (or {"accounts": [...]}) of {"username", "password"} objects."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["accounts"] if isinstance(data, dict) else data, session_dir)
+
+    def _usable(self) -> List[Dict[str, Any]]:
+        return [a for a in self.accounts if a["failures"] < self.max_failures]
+
+    def acquire(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Lease an account, waiting up to timeout seconds for one to be released."""
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._cond:
+            while True:
+                usable = self._usable()
+                if not usable:
+                    raise Exception("All pooled accounts have failed")
+                idle = [a for a in usable if not a["busy"]]
+                if idle:
+                    account = min(idle, key=lambda a: (not a["store"].is_valid(), a["last_used"]))
+                    account["busy"] = True
+                    return account
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise Exception("No pooled account became available")
+                self._cond.wait(remaining)
+
+    def release(self, account: Dict[str, Any], ok: bool = True) -> None:
+        with self._cond:
+            account["busy"] = False
+            account["last_used"] = time.time()
+            account["failures"] = 0 if ok else account["failures"] + 1
+            if not ok and account["failures"] >= self.max_failures:
+                logger.warning(f"Retiring account {account['credentials']['username']} after {account['failures']} failures")
+            self._cond.notify_all()
+
+    def start_refresher(self, reauthenticate, interval: float = 300) -> None:
+        """Re-authenticate idle accounts expiring within interval seconds, now and every interval."""
+        if self._refresher:
+            return
+
+        def refresh_loop():
+            while True:
+                with self._cond:
+                    usable = self._usable()
+                for account in usable:
+                    if self._stop.is_set():
+                        return
+                    with self._cond:
+                        if account["busy"] or account["store"].is_valid(margin=interval):
+                            continue
+                        account["busy"] = True
+                    username = account["credentials"]["username"]
+                    logger.info(f"Refreshing session for {username}")
+                    try:
+                        ok = reauthenticate(account)
+                    except Exception as e:
+                        logger.warning(f"Background re-authentication of {username} failed: {e}")
+                        ok = False
+                    self.release(account, ok)
+                if self._stop.wait(interval):
+                    return
+
+        self._stop.clear()
+        self._refresher = threading.Thread(target=refresh_loop, name="account-refresher", daemon=True)
+        self._refresher.start()
+
+    def stop_refresher(self, timeout: float = 60) -> None:
+        """Stop the refresher and wait up to timeout seconds for a refresh in progress to finish saving."""
+        self._stop.set()
+        if self._refresher:
+            self._refresher.join(timeout)
+            if self._refresher.is_alive():
+                logger.warning(f"Account refresher still running after {timeout:.0f}s, not waiting for it")
+        self._refresher = None
+
+
+class ResourceBlocker:
+    """
+    Route handler that aborts requests for the profile's resource types and for known analytics
+    and ad hosts, counting what it blocked and the bytes of the responses it let through.
+    """
+
+    def __init__(self, profile: str = "standard"):
+        self.profile = profile
+        self.blocked_types = set(BLOCK_PROFILES[profile])
+        self.blocked: Dict[str, int] = {}
+        self.allowed = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+
+    def block_reason(self, resource_type: str, url: str) -> Optional[str]:
+        if resource_type in self.blocked_types:
+            return resource_type
+        host = urlparse(url).hostname or ""
+        if self.blocked_types and any(host == blocked or host.endswith("." + blocked) for blocked in BLOCKED_HOSTS):
+            return "tracker"
+        return None
+
+    def _count(self, reason: Optional[str]) -> None:
+        with self._lock:
+            if reason:
+                self.blocked[reason] = self.blocked.get(reason, 0) + 1
+            else:
+                self.allowed += 1
+
+    def handle(self, route) -> None:
+        reason = self.block_reason(route.request.resource_type, route.request.url)
+        self._count(reason)
+        if reason:
+            route.abort()
+        else:
+            route.continue_()
+
+    async def handle_async(self, route) -> None:
+        reason = self.block_reason(route.request.resource_type, route.request.url)
+        self._count(reason)
+        if reason:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def on_response(self, response) -> None:
+        # Content-Length is free to read; fetching bodies just to size them would cost a round trip each
+        length = response.headers.get("content-length", "")
+        if length.isdigit():
+            with self._lock:
+                self.bytes_received += int(length)
+
+    def merge(self, other: "ResourceBlocker") -> None:
+        with self._lock:
+            for reason, count in other.blocked.items():
+                self.blocked[reason] = self.blocked.get(reason, 0) + count
+            self.allowed += other.allowed
+            self.bytes_received += other.bytes_received
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "profile": self.profile,
+            "blocked_requests": sum(self.blocked.values()),
+            "blocked_by_type": dict(self.blocked),
+            "allowed_requests": self.allowed,
+            "bytes_received": self.bytes_received,
+        }
+
+
+class KeepAliveHTTPPool:
+    """Persistent HTTP(S) connections, one per worker thread and host, for replaying API requests."""
+
+    def __init__(self, timeout: float = 30):
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all_connections: List[http.client.HTTPConnection] = []
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        key = (scheme, netloc)
+        if key not in connections:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            connections[key] = cls(netloc, timeout=self.timeout)
+            with self._lock:
+                self._all_connections.append(connections[key])
+        return connections[key]
+
+    def request(self, method: str, url: str, headers: Dict[str, str], body: Optional[str] = None) -> Tuple[int, bytes]:
+        """Send a request over this thread's kept-alive connection, reconnecting once if it was dropped."""
+        parsed = urlparse(url)
+        path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        for attempt in range(2):
+            conn = self._connection(parsed.scheme, parsed.netloc)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                if response.getheader("Content-Encoding", "").lower() == "gzip":
+                    data = gzip.decompress(data)
+                return response.status, data
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                del self._local.connections[(parsed.scheme, parsed.netloc)]
+                if attempt:
+                    raise
+        return 0, b""
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._all_connections:
+                conn.close()
+            self._all_connections.clear()
+
+
+class ProductTable:
+    """
+    Compact product rows: one shared header schema plus a tuple of cell values per row.
+    Dicts are only built on demand, e.g. at export time, through iter_dicts()/to_dicts().
+    Iterating the table yields dicts, so it can stand in for the list-of-dicts output.
+    """
+
+    def __init__(self, headers: Sequence[str]):
+        self.headers: Tuple[str, ...] = tuple(headers)
+        self.rows: List[Tuple[Any, ...]] = []
+
+    def append(self, cells: Sequence[Any]) -> None:
+        self.rows.append(tuple(cells))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.iter_dicts()
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        headers = self.headers
+        for row in self.rows:
+            yield dict(zip(headers, row))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self.iter_dicts())
+
+    def columns(self) -> Dict[str, List[Any]]:
+        """Column-oriented view: {header: [values...]}."""
+        return {header: [row[i] for row in self.rows] for i, header in enumerate(self.headers)}
+
+
+class ScrollController:
+    """
+    Chooses the scroll step and the wait for new rows on each round of infinite_scroll_table.
+
+    The fixed strategy keeps the original constant step and 2s wait. The adaptive strategy
+    tracks render latency (EWMA) to size the wait, widens the step while rows keep arriving
+    and halves it when a step yields nothing. Both record per-run scroll statistics.
+    """
+
+    def __init__(self, adaptive: bool = False, viewports: float = 5, wait_ms: int = 2000,
+                 min_viewports: float = 0.5, max_viewports: float = 10,
+                 min_wait_ms: int = 150, max_wait_ms: int = 2000):
+        self.adaptive = adaptive
+        self.viewports = viewports
+        self.wait_ms = wait_ms
+        self.min_viewports = min_viewports
+        self.max_viewports = max_viewports
+        self.min_wait_ms = min_wait_ms
+        self.max_wait_ms = max_wait_ms
+        self.latency_ewma: Optional[float] = None
+        self.last_gain = 0
+        self.steps = 0
+        self.rows_gained = 0
+        self.stagnant_steps = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def strategy(self) -> str:
+        return "adaptive" if self.adaptive else "fixed"
+
+    def record(self, rows_gained: int, latency_ms: float, grew: bool) -> None:
+        """Feed back the outcome of one scroll step."""
+        self.steps += 1
+        self.rows_gained += max(rows_gained, 0)
+        self.wait_seconds += latency_ms / 1000
+        if not grew:
+            self.stagnant_steps += 1
+        if not self.adaptive:
+            return
+
+        if grew:
+            self.latency_ewma = latency_ms if self.latency_ewma is None else 0.7 * self.latency_ewma + 0.3 * latency_ms
+            self.wait_ms = int(min(self.max_wait_ms, max(self.min_wait_ms, self.latency_ewma * 3 + 50)))
+            # Rows keep arriving at the same rate or better: stride further
+            if rows_gained >= self.last_gain * 0.9:
+                self.viewports = min(self.max_viewports, self.viewports * 1.5)
+        else:
+            # Nothing rendered: take smaller steps and give the page more time
+            self.viewports = max(self.min_viewports, self.viewports / 2)
+            self.wait_ms = min(self.max_wait_ms, self.wait_ms * 2)
+        self.last_gain = rows_gained
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "steps": self.steps,
+            "rows_gained": self.rows_gained,
+            "stagnant_steps": self.stagnant_steps,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "final_viewports": round(self.viewports, 2),
+            "final_wait_ms": self.wait_ms,
+        }
+
+
+class Metrics:
+    """
+    Run metrics for scrape-health dashboards: spans (count, total and max seconds per name),
+    counters, gauges and value summaries such as rows per scroll step.
+    Exported as JSON or in the Prometheus textfile-collector format. Thread-safe, so
+    parallel workers record into the run's instance.
+    """
+
+    def __init__(self, prefix: str = "iden"):
+        self.prefix = prefix
+        self.spans: Dict[str, Dict[str, float]] = {}
+        self.summaries: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block as one call of the named span."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.time() - start)
+
+    def record_span(self, name: str, seconds: float) -> None:
+        self._add(self.spans, name, seconds)
+
+    def observe(self, name: str, value: float) -> None:
+        """Add one value to a summary (count, sum, min, max)."""
+        self._add(self.summaries, name, value)
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self.gauges[name] = value
+
+    def _add(self, table: Dict[str, Dict[str, float]], name: str, value: float) -> None:
+        with self._lock:
+            entry = table.get(name)
+            if entry is None:
+                table[name] = {"count": 1, "sum": value, "min": value, "max": value}
+                return
+            entry["count"] += 1
+            entry["sum"] += value
+            entry["min"] = min(entry["min"], value)
+            entry["max"] = max(entry["max"], value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "spans": {name: {k: round(v, 4) for k, v in entry.items()} for name, entry in self.spans.items()},
+                "summaries": {name: {k: round(v, 4) for k, v in entry.items()}
+                              for name, entry in self.summaries.items()},
+                "counters": dict(self.counters),
+                "gauges": {name: round(value, 4) for name, value in self.gauges.items()},
+            }
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        data = self.to_dict()
+        p = self.prefix
+        lines = []
+        if data["spans"]:
+            lines += [f"# HELP {p}_span_seconds Wall time spent in instrumented steps of the run.",
+                      f"# TYPE {p}_span_seconds summary"]
+            for name, entry in sorted(data["spans"].items()):
+                lines.append(f'{p}_span_seconds_sum{{span="{name}"}} {entry["sum"]}')
+                lines.append(f'{p}_span_seconds_count{{span="{name}"}} {entry["count"]}')
+            lines.append(f"# TYPE {p}_span_seconds_max gauge")
+            lines += [f'{p}_span_seconds_max{{span="{name}"}} {entry["max"]}'
+                      for name, entry in sorted(data["spans"].items())]
+        for name, entry in sorted(data["summaries"].items()):
+            metric = f"{p}_{_metric_name(name)}"
+            lines += [f"# TYPE {metric} summary", f"{metric}_sum {entry['sum']}", f"{metric}_count {entry['count']}",
+                      f"# TYPE {metric}_max gauge", f"{metric}_max {entry['max']}"]
+        for name, value in sorted(data["counters"].items()):
+            metric = f"{p}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, value in sorted(data["gauges"].items()):
+            metric = f"{p}_{_metric_name(name)}"
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, fmt: str = "json") -> None:
+        """Write the metrics atomically; the textfile collector must never read a half-written file."""
+        if fmt == "json":
+            atomic_write_json(path, self.to_dict())
+            return
+        directory = os.path.dirname(os.path.abspath(path))
+        # Not *.prom: node_exporter reads every *.prom file in the directory, dotfiles included
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def metric_span(name: str):
+    """Decorator recording every call of an automation method (sync or async) as a span in self.metrics."""
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                with self.metrics.span(name):
+                    return await func(self, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.span(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Playwright calls that only build a locator or register a handler, without a protocol round trip
+LOCAL_CALLS = {
+    "locator", "nth", "filter", "or_", "and_", "frame_locator", "content_frame",
+    "get_by_role", "get_by_text", "get_by_label", "get_by_placeholder", "get_by_alt_text",
+    "get_by_title", "get_by_test_id", "on", "once", "remove_listener", "is_closed",
+}
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class CallTracer:
+    """
+    Counts and times Playwright calls by call site, to show which lines the wall time goes to.
+    Wrap a page with trace(): locators and handles it returns are traced too, and every call
+    is recorded under the repo function and line that made it, plus the folded stack of repo
+    functions above it (for flame graphs). Feeds call.<Class>.<method> spans into metrics.
+    """
+
+    def __init__(self, metrics: Optional[Metrics] = None):
+        self.metrics = metrics
+        self.sites: Dict[Tuple[str, str], List[float]] = {}
+        self.stacks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def trace(self, target):
+        return target if isinstance(target, TracedObject) else TracedObject(target, self)
+
+    def wrap(self, value):
+        """Trace Playwright objects handed out by a traced object; pass everything else through."""
+        if type(value).__module__.startswith("playwright.") and not isinstance(value, TracedObject):
+            return TracedObject(value, self)
+        return value
+
+    @staticmethod
+    def call_stack() -> List[Tuple[str, int]]:
+        """(function, line) of the repo frames on the stack, outermost first, skipping the tracer's own."""
+        frames = []
+        frame = sys._getframe(1)
+        while frame:
+            code = frame.f_code
+            if code.co_filename.startswith(REPO_DIR) and not code.co_name.startswith("_traced"):
+                frames.append((code.co_name, frame.f_lineno))
+            frame = frame.f_back
+        return frames[::-1]
+
+    def record(self, stack: List[Tuple[str, int]], call: str, seconds: float) -> None:
+        site = f"{stack[-1][0]}:{stack[-1][1]}" if stack else "?"
+        folded = ";".join([name for name, _ in stack] + [call])
+        with self._lock:
+            entry = self.sites.setdefault((site, call), [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            self.stacks[folded] = self.stacks.get(folded, 0.0) + seconds
+        if self.metrics:
+            self.metrics.inc("traced_calls")
+            self.metrics.record_span(f"call.{call}", seconds)
+
+    def print_report(self, top: int = 15) -> None:
+        """Print the call sites that spent the most time in Playwright calls."""
+        with self._lock:
+            sites = sorted(self.sites.items(), key=lambda item: item[1][1], reverse=True)
+        calls = sum(count for count, _ in self.sites.values())
+        seconds = sum(total for _, total in self.sites.values())
+        print(f"\nCALL TRACE ({calls} Playwright calls, {seconds:.2f}s):")
+        print("=" * 96)
+        print(f"{'call site':<40} {'call':<30} {'calls':>7} {'total':>9} {'avg':>9}")
+        for (site, call), (count, total) in sites[:top]:
+            print(f"{site:<40} {call:<30} {count:>7} {total:>8.2f}s {total / count * 1000:>7.1f}ms")
+        print("=" * 96)
+
+    def write_folded(self, path: str) -> None:
+        """Write folded stacks ("run;navigate_hidden_path;smart_click;Locator.click <us>") for flamegraph.pl or speedscope."""
+        with self._lock:
+            lines = [f"{stack} {int(seconds * 1_000_000)}" for stack, seconds in sorted(self.stacks.items())]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def _untraced(value):
+    return value._target if isinstance(value, TracedObject) else value
+
+
+class TracedObject:
+    """Proxy for a Playwright Page, Locator or handle that records each of its calls in a CallTracer."""
+
+    def __init__(self, target, tracer: CallTracer):
+        self._target = target
+        self._tracer = tracer
+
+    def __repr__(self) -> str:
+        return f"<Traced {self._target!r}>"
+
+    def __getattr__(self, name: str):
+        value = getattr(self._target, name)
+        tracer = self._tracer
+        if not callable(value):
+            # Properties such as locator.first hand out traced objects, page.url passes through
+            return tracer.wrap(value)
+
+        def _traced_local(*args, **kwargs):
+            return tracer.wrap(value(*map(_untraced, args), **{k: _untraced(v) for k, v in kwargs.items()}))
+
+        if name in LOCAL_CALLS:
+            return _traced_local
+        call = f"{type(self._target).__name__}.{name}"
+
+        def _traced_call(*args, **kwargs):
+            stack = tracer.call_stack()
+            start = time.time()
+            try:
+                result = _traced_local(*args, **kwargs)
+            except Exception:
+                tracer.record(stack, call, time.time() - start)
+                raise
+            if not inspect.isawaitable(result):
+                tracer.record(stack, call, time.time() - start)
+                return result
+
+            async def _traced_await():
+                # Async API: the call only completes when awaited
+                try:
+                    return tracer.wrap(await result)
+                finally:
+                    tracer.record(stack, call, time.time() - start)
+            return _traced_await()
+        return _traced_call
+
+
 class IdenUnifiedAutomation:
    
 
-    def __init__(self):
-        self.base_url = LOGIN_URL.rstrip('/')
-        self.credentials = {
+    def __init__(self, credentials: Optional[Dict[str, str]] = None, session_path: str = SESSION_FILE):
+        self.login_url = LOGIN_URL
+        self.challenge_url = CHALLENGE_URL
+        self.base_url = self.login_url.rstrip('/')
+        self.credentials = credentials or {
             "username": os.getenv("IDEN_USERNAME"),
             "password": os.getenv("IDEN_PASSWORD")
         }
-        self.session_file = SESSION_FILE
+        self.session_store = SessionStore(session_path)
+        self.account_pool: Optional[AccountPool] = None
+        self.pool_account: Optional[Dict[str, Any]] = None
         self.output_file = "product_data.json"
+        self.output_format = "json"
+        self.target_count = 2332
+        self.harvest_mode = "final"
+        self.key_column: Optional[str] = None
+        self.engine = "dom"
+        self.captured_payloads: List[Dict[str, Any]] = []
+        self.api_template: Optional[Dict[str, Any]] = None
+        self.api_template_file = API_TEMPLATE_FILE
+        self.replay = False
+        self.replay_workers = 8
+        self.scroll_strategy = "fixed"
+        self.scroll_stats: Dict[str, Any] = {}
+        # Whether the last harvest reached the end of the table (not just the target count)
+        self.harvest_complete = False
+        self.phase_timings: Dict[str, float] = {}
+        # Time spent in _clean_product; it runs inside the extraction phase, so it is not a phase of its own
+        self.cleaning_seconds = 0.0
+        self.wait_savings: Dict[str, Dict[str, float]] = {}
+        self.metrics = Metrics()
+        self.metrics_file: Optional[str] = None
+        self.metrics_format = "json"
+        self.call_tracer: Optional[CallTracer] = None
+        self.trace_folded_file: Optional[str] = None
+        self.playwright_trace: Optional[str] = None
+        self.traced_context: Optional[BrowserContext] = None
+        self.table_headers: List[str] = []
+        self.schema_cache: Dict[str, Dict[str, Any]] = {}
+        self.workers = 1
+        self.headless = False
+        self.checkpoint: Optional[ExtractionCheckpoint] = None
+        self.resume = False
+        self.delta_from: Optional[str] = None
+        self.delta_stop_after = 0
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
         self.pw = None
+        self.use_browser_daemon = False
+        self.deep_link = False
+        self.resource_blocker: Optional[ResourceBlocker] = None
+        self.deep_link_file = DEEP_LINK_FILE
+        self.attached = False
         # Button navigation path
         self.buttons_path = [
             ("button", "Start Journey"),
@@ -62,80 +1217,286 @@ class IdenUnifiedAutomation:
             ("button", "Show Product Table"),
         ]
 
+    def set_base_url(self, url: str) -> None:
+        """Point the run at another deployment of the app, e.g. a local mock_iden_server.py."""
+        self.login_url = url.rstrip("/") + "/"
+        self.challenge_url = urljoin(self.login_url, "challenge")
+        self.base_url = self.login_url.rstrip("/")
+
+    @contextmanager
+    def timed_phase(self, name: str):
+        """Accumulate the wall time spent in a named phase of the run."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            self.phase_timings[name] = self.phase_timings.get(name, 0.0) + elapsed
+            self.metrics.record_span(f"phase.{name}", elapsed)
+
+    @contextmanager
+    def condition_wait(self, phase: str, replaced_seconds: float):
+        """Time an event-driven wait that replaced a fixed sleep of replaced_seconds, for the savings report."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            entry = self.wait_savings.setdefault(phase, {"replaced": 0.0, "waited": 0.0})
+            entry["replaced"] += replaced_seconds
+            entry["waited"] += time.time() - start
+
+    def record_scroll_round(self, seconds: float, rows: int, grew: bool) -> None:
+        """Record one scroll round: its span, the rows it yielded and whether it stagnated."""
+        metrics = self.metrics
+        metrics.record_span("scroll_round", seconds)
+        metrics.inc("scroll_rounds")
+        metrics.inc("rows_harvested", max(rows, 0))
+        metrics.observe("rows_per_step", max(rows, 0))
+        if not grew:
+            metrics.inc("stagnant_rounds")
+
+    def record_run_result(self, products: int) -> None:
+        self.metrics.set("products", products)
+        self.metrics.set("run_success", 1 if products else 0)
+
+    def write_metrics(self, run_seconds: float) -> None:
+        """Write the run's metrics to --metrics-file, if one was given."""
+        if not self.metrics_file:
+            return
+        self.metrics.set("run_duration_seconds", run_seconds)
+        self.metrics.set("last_run_timestamp_seconds", time.time())
+        try:
+            self.metrics.write(self.metrics_file, self.metrics_format)
+            logger.info(f"Metrics written to {self.metrics_file} ({self.metrics_format})")
+        except Exception as e:
+            logger.warning(f"Failed to write metrics: {e}")
+
+    def trace_page(self) -> None:
+        """Route the page's Playwright calls through the call tracer, if tracing is on."""
+        if self.call_tracer and self.page:
+            self.page = self.call_tracer.trace(self.page)
+
+    def report_call_trace(self) -> None:
+        if not self.call_tracer:
+            return
+        self.call_tracer.print_report()
+        if self.trace_folded_file:
+            try:
+                self.call_tracer.write_folded(self.trace_folded_file)
+                print(f"Folded call stacks written to {self.trace_folded_file}")
+            except Exception as e:
+                logger.warning(f"Failed to write folded call stacks: {e}")
+
+    def _start_playwright_trace(self, context: BrowserContext) -> None:
+        """Record a Playwright trace (screenshots, DOM snapshots, sources) of the run's context."""
+        if not self.playwright_trace or context is self.traced_context:
+            return
+        try:
+            context.tracing.start(screenshots=True, snapshots=True, sources=True)
+            self.traced_context = context
+        except Exception as e:
+            logger.warning(f"Failed to start Playwright tracing: {e}")
+
+    def count_round_trip(self) -> None:
+        """Count one browser call made by the scroll loop (cdp_round_trips), at the call site."""
+        self.metrics.inc("cdp_round_trips")
+
+    def new_scroll_controller(self, viewports: float) -> ScrollController:
+        """Create the scroll controller for the configured strategy."""
+        if self.scroll_strategy == "adaptive":
+            return ScrollController(adaptive=True, viewports=1)
+        return ScrollController(adaptive=False, viewports=viewports)
+
+    def print_phase_report(self) -> None:
+        """Print per-phase timings and scroll statistics for the run."""
+        total = sum(self.phase_timings.values()) or 1.0
+        print("\nPHASE TIMINGS:")
+        print("=" * 50)
+        for name, seconds in self.phase_timings.items():
+            print(f"{name:<20} {seconds:8.2f}s  {seconds / total * 100:5.1f}%")
+        if self.scroll_stats:
+            stats = self.scroll_stats
+            print(f"Scroll strategy: {stats['strategy']}, {stats['steps']} steps, "
+                  f"{stats['stagnant_steps']} stagnant, {stats['wait_seconds']:.2f}s waiting for rows")
+        if self.resource_blocker:
+            stats = self.resource_blocker.summary()
+            by_type = ", ".join(f"{k} {v}" for k, v in sorted(stats["blocked_by_type"].items())) or "none"
+            print(f"Resource blocking ({stats['profile']}): {stats['blocked_requests']} requests blocked ({by_type}), "
+                  f"{stats['allowed_requests']} allowed, {stats['bytes_received'] / 1024:.0f} KiB received")
+        for name, entry in self.wait_savings.items():
+            print(f"{name} waits: {entry['waited']:.2f}s on conditions instead of {entry['replaced']:.0f}s "
+                  f"of fixed sleeps (saved {entry['replaced'] - entry['waited']:.2f}s)")
+        print("=" * 50)
+        logger.info(f"Phase timings: {json.dumps({k: round(v, 3) for k, v in self.phase_timings.items()})}")
+
     def cleanup_invalid_session_files(self):
         """Remove invalid session files to force fresh login."""
         try:
-            files_to_remove = [self.session_file, "session_storage.json", "local_storage.json"]
-            for file_path in files_to_remove:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    logger.info(f"Removed invalid session file: {file_path}")
+            self.session_store.clear()
         except Exception as e:
             logger.warning(f"Failed to cleanup session files: {e}")
 
-    def setup_browser(self, headless: bool = False) -> bool:
+    @metric_span("setup_browser")
+    def setup_browser(self, headless: bool = False, restore: bool = True) -> bool:
         """
-        Initialize browser and context.
+        Initialize browser and context. With restore=False the saved session is ignored.
         Returns True if an existing session was reused successfully, False otherwise.
         """
         try:
-            self.pw = sync_playwright().start()
-            self.browser = self.pw.chromium.launch(
-                headless=headless,
-                args=['--no-sandbox', '--disable-dev-shm-usage']
-            )
-
-            if self.has_valid_session_files():
-                try:
-                    logger.info("Found existing session files, attempting to reuse...")
-
-                    # Open a fresh context without storage_state
-                    self.context = self.browser.new_context()
-                    self.page = self.context.new_page()
+            with self.timed_phase("browser_launch"):
+                if not (self.use_browser_daemon and self.attach_browser()):
+                    self.pw = sync_playwright().start()
+                    self.browser = self.pw.chromium.launch(headless=headless, args=BROWSER_ARGS)
 
-                    # Navigate to the base domain first
-                    self.page.goto(self.base_url, wait_until="domcontentloaded")
+            with self.timed_phase("session_restore"):
+                if restore and self.has_valid_session_files():
+                    try:
+                        logger.info("Found existing session files, attempting to reuse...")
 
-                    # Inject saved sessionStorage before going to challenge
-                    with open("session_storage.json", "r", encoding="utf-8") as f:
-                        session_storage = json.load(f)
+                        # Open a fresh context without storage_state (the daemon's warm default context when attached)
+                        self.context = self._new_context()
+                        self.page = self.context.new_page()
+                        self.install_resource_blocking(self.context, self.page)
 
-                    restored_count = 0
-                    for k, v in session_storage.items():
-                        safe_value = json.dumps(v)  # handles quotes safely
-                        self.page.evaluate(f"sessionStorage.setItem('{k}', {safe_value})")
-                        restored_count += 1
-                    logger.info(f"Restored {restored_count} sessionStorage keys")
+                        # Restore saved sessionStorage in one init script, so the first navigation already has it
+                        session_storage = self.session_store.session_storage
+                        self.page.add_init_script(session_restore_script(session_storage, self.challenge_url))
+                        logger.info(f"Restoring {len(session_storage)} sessionStorage keys")
 
-                    # Reload challenge page with session data in place
-                    self.page.goto(CHALLENGE_URL, wait_until="networkidle")
+                        # A token with a known, future expiry needs no networkidle wait to prove it still works
+                        self.page.goto(self.challenge_url, wait_until=self._restore_wait_until())
 
-                    if "challenge" in self.page.url:
-                        logger.info("Existing session valid, skipping login")
-                        print("Session reused successfully! Skipping authentication...")
-                        return True
-                    else:
-                        logger.info("Session invalid, forcing fresh login")
+                        if "challenge" in self.page.url:
+                            logger.info("Existing session valid, skipping login")
+                            print("Session reused successfully! Skipping authentication...")
+                            return True
+                        else:
+                            logger.info("Session invalid, forcing fresh login")
+                            self.cleanup_invalid_session_files()
+                            if self.attached:
+                                self.page.close()
+                            else:
+                                self.context.close()
+                            return False
+
+                    except Exception as e:
+                        logger.warning(f"Failed to reuse existing session: {e}")
                         self.cleanup_invalid_session_files()
-                        self.context.close()
                         return False
 
-                except Exception as e:
-                    logger.warning(f"Failed to reuse existing session: {e}")
-                    self.cleanup_invalid_session_files()
-                    return False
-
             # No valid session found,login needed
             logger.info("Creating fresh browser context")
             print("No valid session found, creating fresh browser context...")
-            self.context = self.browser.new_context()
+            self.context = self._new_context()
             self.page = self.context.new_page()
+            self.install_resource_blocking(self.context, self.page)
             return False
 
         except Exception as e:
             logger.error(f"Browser setup failed: {e}")
             raise
 
+    def install_resource_blocking(self, context: BrowserContext, page: Page) -> None:
+        """Route requests through the resource blocker; page-level when sharing the daemon's context."""
+        if not self.resource_blocker:
+            return
+        (page if self.attached else context).route("**/*", self.resource_blocker.handle)
+        page.on("response", self.resource_blocker.on_response)
+
+    def _restore_wait_until(self) -> str:
+        if self.session_store.token_expires_at is not None:
+            logger.info("Saved token has not expired, skipping the networkidle check")
+            return "domcontentloaded"
+        return "networkidle"
+
+    def attach_browser(self) -> bool:
+        """Connect to the warm browser started with --serve-browser. Returns False if none is reachable."""
+        endpoint = read_browser_endpoint()
+        if not endpoint:
+            logger.info("No browser daemon running, launching a new browser")
+            return False
+        try:
+            self.pw = sync_playwright().start()
+            self.browser = self.pw.chromium.connect_over_cdp(endpoint)
+            self.attached = True
+            logger.info(f"Attached to browser daemon at {endpoint}")
+            print(f"Attached to warm browser at {endpoint}")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not attach to browser daemon at {endpoint}: {e}")
+            if self.pw:
+                self.pw.stop()
+                self.pw = None
+            return False
+
+    def _new_context(self) -> BrowserContext:
+        """A new context, or the daemon's default context (which holds its login cookies) when attached."""
+        if self.attached and self.browser.contexts:
+            # Tracing is per context, and this one belongs to the daemon and every attached run
+            if self.playwright_trace:
+                logger.warning("Playwright tracing is not started on the browser daemon's shared context")
+            return self.browser.contexts[0]
+        context = self.browser.new_context()
+        self._start_playwright_trace(context)
+        return context
+
+    def serve_browser(self, headless: bool = False, port: int = 9222, refresh_interval: int = 600) -> None:
+        """
+        Keep a warm, authenticated Chromium running for later runs to attach to with --use-browser-daemon.
+        The browser uses a persistent profile so its default context keeps the login cookies, and its
+        CDP endpoint is advertised in BROWSER_ENDPOINT_FILE. The session is re-checked every
+        refresh_interval seconds, both the saved tokens and the daemon's own page, so the warm
+        context stays signed in as well as session.json. Blocks until interrupted.
+        """
+        self.pw = sync_playwright().start()
+        try:
+            self.context = self.pw.chromium.launch_persistent_context(
+                BROWSER_PROFILE_DIR, headless=headless,
+                args=BROWSER_ARGS + [f"--remote-debugging-port={port}"]
+            )
+            self.page = self.context.pages[0] if self.context.pages else self.context.new_page()
+            if not self._daemon_signed_in() and not self.authenticate():
+                raise Exception("Authentication failed")
+            atomic_write_json(BROWSER_ENDPOINT_FILE, {
+                "endpoint": f"http://127.0.0.1:{port}",
+                "pid": os.getpid(),
+                "started_at": datetime.now().isoformat(timespec="seconds"),
+            })
+            print(f"Browser daemon ready on http://127.0.0.1:{port} (Ctrl+C to stop)")
+            logger.info(f"Browser daemon listening on port {port}")
+            while True:
+                time.sleep(refresh_interval)
+                # Re-authenticate before the token would expire during the next interval
+                if not self._daemon_signed_in(margin=refresh_interval):
+                    logger.info("Daemon session expired, re-authenticating")
+                    self.authenticate()
+        except KeyboardInterrupt:
+            print("Stopping browser daemon")
+        finally:
+            if os.path.exists(BROWSER_ENDPOINT_FILE):
+                os.remove(BROWSER_ENDPOINT_FILE)
+            try:
+                self.context.close()
+            except Exception:
+                pass
+            self.pw.stop()
+
+    def _daemon_signed_in(self, margin: float = 0) -> bool:
+        """True if the saved tokens outlive margin and the daemon's page loads the challenge page."""
+        if not self.validate_session(margin=margin):
+            return False
+        try:
+            # The offline token check says nothing about the daemon's page, so load it there too
+            self.page.goto(self.challenge_url)
+            self.wait_for_idle_network()
+            signed_in = "challenge" in self.page.url
+        except Exception as e:
+            logger.warning(f"Daemon page check failed: {e}")
+            return False
+        if not signed_in:
+            logger.info("Daemon page is not signed in")
+        return signed_in
+
     def save_session(self) -> None:
         """Save current session after a successful login on the challenge page."""
         try:
@@ -148,65 +1509,53 @@ class IdenUnifiedAutomation:
                 logger.warning("Not on challenge page, skipping session save")
                 return
 
-            # Save Playwright cookies and localStorage 
-            self.context.storage_state(path=self.session_file)
-            logger.info(f"Session saved to {self.session_file}")
-
-            # Save sessionStorage separately (this is where the auth tokens are)
+            # Playwright cookies and localStorage, plus sessionStorage (this is where the auth tokens are)
+            storage_state = self.context.storage_state()
             try:
-                session_storage = self.page.evaluate(
-                    "() => Object.entries(sessionStorage).reduce((obj,[k,v]) => (obj[k]=v,obj), {})"
-                )
-                with open("session_storage.json", "w", encoding="utf-8") as f:
-                    json.dump(session_storage, f, indent=2, ensure_ascii=False)
-                
-                # Also save localStorage as backup
-                localStorage = self.page.evaluate(
-                    "() => Object.entries(localStorage).reduce((obj,[k,v]) => (obj[k]=v,obj), {})"
-                )
-                with open("local_storage.json", "w", encoding="utf-8") as f:
-                    json.dump(localStorage, f, indent=2, ensure_ascii=False)
-                
-                logger.info(f"Storage saved: {len(session_storage)} sessionStorage, {len(localStorage)} localStorage keys")
-                
+                session_storage = self.page.evaluate(SESSION_STORAGE_JS)
+                localStorage = self.page.evaluate(LOCAL_STORAGE_JS)
             except Exception as e:
-                logger.warning(f"Failed to save storage: {e}")
+                logger.warning(f"Failed to read storage: {e}")
+                session_storage, localStorage = {}, {}
+
+            self.session_store.save(storage_state, session_storage, localStorage)
+            logger.info(f"Session saved to {self.session_store.path}: {len(session_storage)} sessionStorage, "
+                        f"{len(localStorage)} localStorage keys")
 
         except Exception as e:
             logger.error(f"Failed to save storage state: {e}")
 
     def has_valid_session_files(self) -> bool:
-        """Check if we have valid session files with actual data."""
+        """Check if we have a saved session with sessionStorage keys that has not expired."""
         try:
-            # Check if main session file exists (even if empty, use sessionStorage)
-            if not os.path.exists(self.session_file):
-                return False
-            
-            # Check if sessionStorage file exists and has content
-            if not os.path.exists("session_storage.json") or os.path.getsize("session_storage.json") <= 10:
+            if not self.session_store.is_valid():
+                if self.session_store.session_storage:
+                    logger.info("Saved session has expired")
                 return False
-            
-            # Verify sessionStorage has actual keys
-            with open("session_storage.json", "r", encoding="utf-8") as f:
-                session_data = json.load(f)
-                if not session_data or len(session_data) == 0:
-                    return False
-            
-            logger.info(f"Found valid session files with {len(session_data)} sessionStorage keys")
+
+            logger.info(f"Found valid session with {len(self.session_store.session_storage)} sessionStorage keys")
             return True
             
         except Exception as e:
             logger.warning(f"Error checking session files: {e}")
             return False
 
-    def validate_session(self) -> bool:
-        """Validate if the current session is still valid."""
+    def validate_session(self, margin: float = 0) -> bool:
+        """
+        Validate if the current session is still valid. When the saved tokens carry an expiry
+        this is decided offline; otherwise by loading the challenge page.
+        """
         try:
+            if self.session_store.token_expires_at is not None:
+                valid = self.session_store.is_valid(margin)
+                logger.info(f"Session is {'still valid' if valid else 'expired'} (token expiry, no page load)")
+                return valid
+
             if not self.page:
                 return False
             
             # Try to navigate to a protected page to check session validity
-            self.page.goto(CHALLENGE_URL)
+            self.page.goto(self.challenge_url)
             self.wait_for_idle_network()
             
             # Check if we're redirected to login or if we can access the challenge
@@ -234,23 +1583,7 @@ class IdenUnifiedAutomation:
             
             # Wait for either cookies, localStorage auth token, or sessionStorage auth token
             result = self.page.wait_for_function(
-                """() => {
-                    // Check if we have any cookies
-                    if (document.cookie && document.cookie.length > 0) return true;
-                    
-                    // Check if we have any localStorage items
-                    if (Object.keys(localStorage).length > 0) return true;
-                    
-                    // Check if we have any sessionStorage items
-                    if (Object.keys(sessionStorage).length > 0) return true;
-                    
-                    // Check for specific auth-related keys
-                    if (localStorage.getItem("authToken") !== null) return true;
-                    if (localStorage.getItem("session") !== null) return true;
-                    if (localStorage.getItem("token") !== null) return true;
-                    
-                    return false;
-                }""",
+                AUTH_DATA_PRESENT_JS,
                 timeout=timeout_ms
             )
             
@@ -265,10 +1598,11 @@ class IdenUnifiedAutomation:
             logger.warning(f"Error waiting for auth data: {e}")
             return False
 
+    @metric_span("authenticate")
     def authenticate(self) -> bool:
         """Authenticate only if no valid session exists."""
         try:
-            self.page.goto(LOGIN_URL)
+            self.page.goto(self.login_url)
             self.wait_for_idle_network()
 
             if not (self.credentials["username"] and self.credentials["password"]):
@@ -278,22 +1612,25 @@ class IdenUnifiedAutomation:
             # Fill username
             self.page.fill('input[type="email"]', self.credentials["username"])
             self.page.fill('input[type="password"]', self.credentials["password"])
+            before_login = self.page.evaluate(LOGIN_STATE_JS)
             self.page.click('button[type="submit"]')
 
-            self.wait_for_idle_network()
-            time.sleep(2)
+            with self.condition_wait("authentication", replaced_seconds=2):
+                try:
+                    self.page.wait_for_function(LOGIN_SETTLED_JS, arg=before_login, timeout=15000)
+                except PlaywrightTimeoutError:
+                    logger.warning("Login did not navigate or store a session token, continuing to the challenge page")
 
             # Go to challenge page after login
-            self.page.goto(CHALLENGE_URL)
+            self.page.goto(self.challenge_url)
             self.wait_for_idle_network()
 
             if "challenge" in self.page.url:
                 logger.info("Authentication successful, saving session")
-                # Wait a bit longer to ensure all session data is stored
-                time.sleep(3)
-                
                 # Wait for authentication data to be present
-                if self.wait_for_auth_data(timeout_ms=15000):
+                with self.condition_wait("authentication", replaced_seconds=3):
+                    auth_data_present = self.wait_for_auth_data(timeout_ms=15000)
+                if auth_data_present:
                     logger.info("Authentication data confirmed, saving session")
                     self.save_session()
                     return True
@@ -320,11 +1657,53 @@ class IdenUnifiedAutomation:
             logger.error(f"Failed to click '{name}': {e}")
             return False
 
+    def load_deep_link(self) -> Optional[str]:
+        """URL of the product table recorded by an earlier run, if any."""
+        try:
+            with open(self.deep_link_file, "r", encoding="utf-8") as f:
+                return json.load(f).get("url")
+        except (OSError, ValueError):
+            return None
+
+    def record_deep_link(self, url: str) -> None:
+        """Remember the URL the click path ended on, or forget it if the table has no URL of its own."""
+        if url.rstrip("/") == self.challenge_url.rstrip("/"):
+            logger.info("Product table has no URL of its own, nothing to deep-link to")
+            if os.path.exists(self.deep_link_file):
+                os.remove(self.deep_link_file)
+            return
+        if url != self.load_deep_link():
+            atomic_write_json(self.deep_link_file, {"url": url, "recorded_at": datetime.now().isoformat(timespec="seconds")})
+            logger.info(f"Recorded deep link to the product table: {url}")
+
+    def open_deep_link(self, page: Page) -> bool:
+        """Jump straight to the recorded product table URL. On failure the page is left on the challenge start."""
+        url = self.load_deep_link()
+        if not url:
+            return False
+        try:
+            logger.info(f"Opening product table deep link: {url}")
+            page.goto(url, wait_until="domcontentloaded")
+            page.wait_for_selector("table >> tbody tr", timeout=10000)
+            logger.info("Table found via deep link")
+            return True
+        except Exception as e:
+            logger.warning(f"Deep link failed ({e}), falling back to the button path")
+            page.goto(self.challenge_url, wait_until="domcontentloaded")
+            return False
+
+    @metric_span("navigate_hidden_path")
     def navigate_hidden_path(self, page: Page) -> bool:
-        """Navigate through the hidden path to access product table."""
+        """
+        Navigate through the hidden path to access product table. In deep-link mode the
+        table URL recorded by an earlier run is tried first, and the URL reached by
+        clicking is recorded for next time.
+        """
         try:
+            if self.deep_link and self.open_deep_link(page):
+                return True
             logger.info("Navigating hidden path...")
-            for role, name in self.buttons_path:
+            for step, (role, name) in enumerate(self.buttons_path):
                 logger.info(f"Attempting to click button for: {name}")
                 if not self.smart_click(page, role, name):
                     if name == "Show Product Table":
@@ -333,11 +1712,13 @@ class IdenUnifiedAutomation:
                     else:
                         logger.error(f"Failed to click {name} button")
                         return False
-                time.sleep(1)
-                self.wait_for_idle_network()
+                with self.condition_wait("navigation", replaced_seconds=1):
+                    self._wait_for_step_target(page, step)
             try:
                 page.wait_for_selector("table >> tbody tr", timeout=20000)
                 logger.info("Table found successfully")
+                if self.deep_link:
+                    self.record_deep_link(page.url)
                 return True
             except PlaywrightTimeoutError:
                 logger.error("Table not found after navigation")
@@ -346,158 +1727,1254 @@ class IdenUnifiedAutomation:
             logger.error(f"Navigation failed: {e}")
             return False
 
+    def _step_target(self, page: Page, step: int):
+        """What the click at step reveals: the next button on the path, or the table (which may come early)."""
+        table_rows = page.locator("table >> tbody tr")
+        if step + 1 < len(self.buttons_path):
+            role, name = self.buttons_path[step + 1]
+            return page.get_by_role(role, name=re.compile(rf"^{re.escape(name)}$", re.I)).or_(table_rows).first
+        return table_rows.first
+
+    def _wait_for_step_target(self, page: Page, step: int, timeout: int = 15000) -> None:
+        """Wait until the click at step has revealed its target; a miss is left to the next click to report."""
+        try:
+            self._step_target(page, step).wait_for(state="visible", timeout=timeout)
+        except PlaywrightTimeoutError:
+            logger.warning(f"Nothing appeared after clicking '{self.buttons_path[step][1]}'")
+
     def get_scrollable_parent_selector(self, page: Page, table_selector: str = "table") -> str:
         """Find the closest scrollable ancestor of the table."""
-        script = """
-        (sel) => {
-            const el = document.querySelector(sel);
-            if (!el) return "body";
-            function isScrollable(node) {
-                const style = window.getComputedStyle(node);
-                const overflowY = style.overflowY;
-                const canScroll = node.scrollHeight > node.clientHeight + 2;
-                return canScroll && (overflowY === 'auto' || overflowY === 'scroll');
-            }
-            let p = el.parentElement;
-            while (p && p !== document.body) {
-                if (isScrollable(p)) {
-                    if (p.id) return '#' + p.id;
-                    if (p.className && typeof p.className === 'string') {
-                        const firstClass = p.className.trim().split(/\\s+/)[0];
-                        if (firstClass) return p.tagName.toLowerCase() + '.' + firstClass;
-                    }
-                    return p.tagName.toLowerCase();
-                }
-                p = p.parentElement;
-            }
-            return "body";
-        }
-        """
         try:
-            sel = page.evaluate(script, table_selector)
+            sel = page.evaluate(SCROLLABLE_PARENT_JS, table_selector)
             return sel
         except Exception:
             return "body"
 
+    def _schema_key(self, page: Page) -> str:
+        return urlparse(page.url)._replace(query="", fragment="").geturl()
+
+    def _cache_schema(self, key: str, schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Fill in Column_N headers for a table without a header row, and cache a non-empty schema."""
+        schema = schema or {"headers": [], "columnCount": 0, "rowCells": 0}
+        if not schema["headers"]:
+            # Fallback: name the columns of the first row
+            schema["headers"] = [f"Column_{i+1}" for i in range(schema["columnCount"])]
+        if schema["rowCells"] and schema["rowCells"] != len(schema["headers"]):
+            logger.warning(f"First row has {schema['rowCells']} cells for {len(schema['headers'])} headers, "
+                           "rows will be padded or truncated")
+        if schema["headers"]:
+            self.schema_cache[key] = schema
+        return schema
+
+    def extract_table_schema(self, page: Page) -> Dict[str, Any]:
+        """
+        Headers, column count and first-row cell count of the table, read in a single evaluate.
+        Cached per table URL for the session; parallel workers share the cache.
+        """
+        key = self._schema_key(page)
+        if key in self.schema_cache:
+            return self.schema_cache[key]
+        return self._cache_schema(key, page.evaluate(TABLE_SCHEMA_JS))
+
     def extract_headers(self, page: Page) -> List[str]:
-        """Extract table headers."""
+        """Extract table headers (Column_N names when the table has no header row)."""
         try:
-            headers = []
-            ths = page.locator("table thead th")
-            if ths.count() > 0:
-                for i in range(ths.count()):
-                    headers.append(ths.nth(i).inner_text().strip())
-            else:
-                # Fallback: use first row as headers
-                tds = page.locator("table tbody tr").first.locator("td")
-                for i in range(tds.count()):
-                    headers.append(f"Column_{i+1}")
-            return headers
+            return list(self.extract_table_schema(page)["headers"])
         except Exception:
             return []
 
-    def infinite_scroll_table(self, page: Page, target_count: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Extract all table data using DOM-only approach for virtualized tables."""
+    def _resolve_key_index(self, headers: List[str], key_column: Optional[str] = None) -> Optional[int]:
+        """Find the column used as a stable row key (explicit column, then an ID-like header)."""
+        if key_column and key_column in headers:
+            return headers.index(key_column)
+        for i, header in enumerate(headers):
+            if re.match(r"^(id|#|product[ _-]?id|sku)$", header.strip(), re.I):
+                return i
+        return None
+
+    def _row_key(self, row_cells: List[Optional[str]], key_index: Optional[int]) -> Any:
+        """Build the dedupe key for a row: the key column if known, otherwise the full row."""
+        if key_index is not None and key_index < len(row_cells) and row_cells[key_index]:
+            return row_cells[key_index]
+        return tuple(row_cells)
+
+    def _normalize_cells(self, headers: List[str], row_cells: List[Optional[str]]) -> Tuple[Optional[str], ...]:
+        """Fit raw cell texts to the header width: pad with None, truncate extras, strip text."""
+        # Pad row_cells with None if it's shorter than headers
+        padded_cells = row_cells + [None] * max(0, len(headers) - len(row_cells))
+        # Truncate if longer than headers
+        padded_cells = padded_cells[:len(headers)]
+        return tuple(c.strip() if c else None for c in padded_cells)
+
+    def _scroll_step(self, page: Page, container, scroll_container: str, viewports: float = 5,
+                     clamp_to_rendered: bool = False) -> float:
+        """
+        Advance the scroll container by the given number of viewport heights.
+        With clamp_to_rendered the step never passes the last rendered row, so a
+        virtualized table cannot recycle rows that were never on screen.
+        Returns the new scroll position as a fraction of the scroll height.
+        """
         try:
-            logger.info("Starting DOM-only infinite scroll extraction")
-            page.wait_for_selector("table", state="visible")
-            scroll_container = self.get_scrollable_parent_selector(page, "table")
-            container = page.locator(scroll_container)
-            container.first.scroll_into_view_if_needed()
-            page.wait_for_timeout(1000)
-
-            headers = self.extract_headers(page)
-            rows_data = []
+            self.count_round_trip()
+            # For "body" the step scrolls the window, so body-scrolled tables are stepped through too
+            return container.first.evaluate(SCROLL_STEP_JS, {"viewports": viewports, "clamp": clamp_to_rendered})
+        except Exception:
+            return 0.0
 
-            stagnant_rounds = 0
-            max_stagnant = 3
+    def harvest_rendered_rows(self, page: Page) -> List[List[str]]:
+        """
+        Return the cells of rows rendered (or recycled with new content) since the last call.
+        Rows already harvested are remembered in-page, so only new rows cross the wire.
+        """
+        self.count_round_trip()
+        return page.evaluate(HARVEST_ROWS_JS)
 
-            while stagnant_rounds < max_stagnant:
-                current_count = page.locator("table tbody tr").count()
-                if target_count and current_count >= target_count:
-                    break
-                
-                # Show progress every 100 rows
-                if current_count % 100 == 0 and current_count > 0:
-                    logger.info(f"Progress: {current_count} rows extracted")
-                try:
-                    if scroll_container == "body":
-                        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    else:
-                        container.first.evaluate("(el) => el.scrollTop += el.clientHeight * 5")
-                except Exception:
-                    pass
-                try:
-                    page.wait_for_function(
-                        f"document.querySelectorAll('table tbody tr').length > {current_count}", timeout=2000
-                    )
-                    grew = True
-                except PlaywrightTimeoutError:
-                    grew = False
-                new_count = page.locator("table tbody tr").count()
-                if new_count == current_count:
-                    stagnant_rounds += 1
-                else:
-                    stagnant_rounds = 0
-                if target_count and new_count >= target_count:
-                    break
+    def wait_for_new_rows(self, page: Page, timeout_ms: int = 2000) -> bool:
+        """Wait until a row appears that has not been harvested yet."""
+        try:
+            self.count_round_trip()
+            page.wait_for_function(WAIT_FOR_NEW_ROWS_JS, timeout=timeout_ms, polling=100)
+            return True
+        except PlaywrightTimeoutError:
+            return False
 
-            raw_rows = page.eval_on_selector_all(
-                "table tbody tr", "els => els.map(tr => Array.from(tr.cells, td => td.innerText.trim()))"
-            )
-            for row_cells in raw_rows:
-                # Pad row_cells with None if it's shorter than headers
-                padded_cells = row_cells + [None] * max(0, len(headers) - len(row_cells))
-                # Truncate if longer than headers
-                padded_cells = padded_cells[:len(headers)]
-                
-                if len(headers) > 0:
-                    row_dict = dict(zip(headers, [c.strip() if c else None for c in padded_cells]))
-                else:
-                    # Fallback if no headers
-                    row_dict = {f"Column_{j+1}": c.strip() if c else None for j, c in enumerate(padded_cells)}
-                rows_data.append(row_dict)
-            logger.info(f" Scraped {len(rows_data)} rows")
-            return rows_data
+    def infinite_scroll_table(self, page: Page, target_count: Optional[int] = None,
+                              harvest_mode: str = "final", key_column: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Extract all table data using DOM-only approach for virtualized tables."""
+        return self.scroll_table(page, target_count=target_count,
+                                 harvest_mode=harvest_mode, key_column=key_column).to_dicts()
+
+    def scroll_table(self, page: Page, target_count: Optional[int] = None,
+                     harvest_mode: str = "final", key_column: Optional[str] = None,
+                     partition: Optional[Tuple[float, float]] = None) -> ProductTable:
+        """Extract all table data into a compact ProductTable (tuples sharing one header schema)."""
+        table = ProductTable([])
+        try:
+            for cells in self.iter_table_tuples(page, target_count=target_count, harvest_mode=harvest_mode,
+                                                key_column=key_column, partition=partition):
+                table.append(cells)
         except Exception as e:
             logger.error(f"Error in infinite_scroll_table: {e}")
+            return ProductTable([])
+        table.headers = tuple(self.table_headers)
+        return table
+
+    def iter_table_rows(self, page: Page, target_count: Optional[int] = None,
+                        harvest_mode: str = "final", key_column: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield table rows as dicts keyed by header, as they are harvested."""
+        for cells in self.iter_table_tuples(page, target_count=target_count,
+                                            harvest_mode=harvest_mode, key_column=key_column):
+            yield dict(zip(self.table_headers, cells))
+
+    def iter_table_tuples(self, page: Page, target_count: Optional[int] = None,
+                          harvest_mode: str = "final", key_column: Optional[str] = None,
+                          partition: Optional[Tuple[float, float]] = None) -> Iterator[Tuple[Any, ...]]:
+        """
+        Yield table rows as tuples of cell values, as they are harvested from the virtualized table.
+        The matching headers are available in self.table_headers before the first row is yielded.
+        With partition=(start, end), only the slice between those fractions of the scroll
+        height is harvested; this needs a per-step harvest mode ("final" becomes "incremental").
+
+        harvest_mode:
+            "final"       - scroll until stagnation, then read the DOM once
+            "incremental" - harvest newly rendered rows after every scroll step and
+                            dedupe them by a stable key, so recycled rows are not lost
+            "observer"    - like incremental, but an in-page MutationObserver buffers new
+                            rows and each step is a single drain-scroll-wait round trip
+        """
+        logger.info(f"Starting DOM-only infinite scroll extraction (mode: {harvest_mode})")
+        page.wait_for_selector("table", state="visible")
+        scroll_container = self.get_scrollable_parent_selector(page, "table")
+        container = page.locator(scroll_container)
+        container.first.scroll_into_view_if_needed()
+        page.wait_for_timeout(1000)
+
+        headers = self.extract_headers(page)
+        self.table_headers = headers
+        if partition and scroll_container == "body":
+            # The window scroller cannot be positioned per partition: the first worker takes the whole table
+            if partition[0] > 0:
+                logger.warning("Table scrolls with the page and cannot be partitioned, leaving it to the first worker")
+                return
+            logger.warning("Table scrolls with the page and cannot be partitioned, harvesting all of it")
+            partition = None
+        if partition:
+            harvest_mode = "observer" if harvest_mode == "observer" else "incremental"
+            container.first.evaluate("(el, f) => { el.scrollTop = el.scrollHeight * f; }", partition[0])
+            logger.info(f"Harvesting partition {partition[0]:.2f}-{partition[1]:.2f} of the table")
+        seed_rows: List[Tuple[Any, ...]] = []
+        if self.checkpoint and not partition:
+            # Checkpoints need per-step harvesting
+            harvest_mode = "observer" if harvest_mode == "observer" else "incremental"
+            seed_rows = self._restore_checkpoint(container, scroll_container, headers)
+        if harvest_mode in ("incremental", "observer"):
+            yield from self._harvest_while_scrolling(page, headers, container, scroll_container,
+                                                     target_count, key_column,
+                                                     use_observer=harvest_mode == "observer",
+                                                     stop_fraction=partition[1] if partition else None,
+                                                     seed_rows=seed_rows)
+            return
+
+        controller = self.new_scroll_controller(viewports=5)
+
+        stagnant_rounds = 0
+        max_stagnant = 3
+        next_progress = 100
+
+        while stagnant_rounds < max_stagnant:
+            round_start = time.time()
+            self.count_round_trip()
+            current_count = page.locator("table tbody tr").count()
+            if target_count and current_count >= target_count:
+                break
+            
+            # Show progress each time another 100 rows have rendered
+            if current_count >= next_progress:
+                logger.info(f"Progress: {current_count} rows extracted")
+                next_progress = (current_count // 100 + 1) * 100
+            self._scroll_step(page, container, scroll_container, viewports=controller.viewports)
+            wait_start = time.time()
+            try:
+                self.count_round_trip()
+                page.wait_for_function(
+                    f"document.querySelectorAll('table tbody tr').length > {current_count}",
+                    timeout=controller.wait_ms
+                )
+                grew = True
+            except PlaywrightTimeoutError:
+                grew = False
+            latency_ms = (time.time() - wait_start) * 1000
+            self.count_round_trip()
+            new_count = page.locator("table tbody tr").count()
+            controller.record(new_count - current_count, latency_ms, new_count > current_count)
+            self.record_scroll_round(time.time() - round_start, new_count - current_count,
+                                     new_count > current_count)
+            if new_count == current_count:
+                stagnant_rounds += 1
+            else:
+                stagnant_rounds = 0
+            if target_count and new_count >= target_count:
+                break
+        self.scroll_stats = controller.summary()
+        # Only the rows still rendered are read below; on a virtualized table that is a window, not the table
+        self.harvest_complete = False
+
+        raw_rows = page.eval_on_selector_all(
+            "table tbody tr", "els => els.map(tr => Array.from(tr.cells, td => td.innerText.trim()))"
+        )
+        logger.info(f" Scraped {len(raw_rows)} rows")
+        for row_cells in raw_rows:
+            yield self._normalize_cells(headers, row_cells)
+
+    def install_row_observer(self, page: Page) -> bool:
+        """
+        Install an in-page MutationObserver that buffers inserted or re-rendered table rows.
+        Rows already in the table are queued too, so the first drain returns them.
+        """
+        try:
+            return bool(page.evaluate(INSTALL_ROW_OBSERVER_JS))
+        except Exception as e:
+            logger.warning(f"Failed to install row observer: {e}")
+            return False
+
+    def drain_observed_rows(self, page: Page, scroll_container: str, viewports: float = 1,
+                            timeout_ms: int = 2000, clamp_to_rendered: bool = False) -> Dict[str, Any]:
+        """
+        One round trip per scroll step: drain the buffered rows, scroll, then wait in-page
+        until the observer sees new rows (or the timeout passes).
+        Returns {"rows": [...cells], "grew": bool, "latency": ms spent waiting,
+        "position": scroll position as a fraction of the scroll height}.
+        """
+        self.count_round_trip()
+        return page.evaluate(DRAIN_OBSERVED_ROWS_JS, {"sel": scroll_container, "viewports": viewports,
+                                      "timeout": timeout_ms, "clamp": clamp_to_rendered})
+
+    def _restore_checkpoint(self, container, scroll_container: str, headers: List[str]) -> List[Tuple[Any, ...]]:
+        """
+        Start checkpointing. When resuming from a checkpoint with the same headers, jump the
+        scroll container just before the saved position and return the saved rows.
+        """
+        checkpoint = self.checkpoint
+        if not (self.resume and checkpoint.exists()):
+            checkpoint.start(headers)
+            return []
+        try:
+            meta, rows = checkpoint.load()
+        except Exception as e:
+            logger.warning(f"Checkpoint unreadable ({e}), starting from the top")
+            checkpoint.start(headers)
             return []
+        if meta.get("headers") != headers:
+            logger.warning("Table headers changed since the checkpoint, starting from the top")
+            checkpoint.start(headers)
+            return []
+
+        checkpoint.start(headers, resume=True, meta=meta)
+        position = max(0.0, float(meta.get("position", 0.0)) - 0.01)
+        if scroll_container != "body" and position > 0:
+            container.first.evaluate("(el, f) => { el.scrollTop = el.scrollHeight * f; }", position)
+        logger.info(f"Resuming from checkpoint: {len(rows)} rows, scroll position {position:.2%}")
+        print(f"Resuming from checkpoint with {len(rows)} rows already harvested")
+        return rows
+
+    def _row_ingester(self, headers: List[str], key_index: Optional[int],
+                      seen_keys: Set[Any]) -> Callable[[List[List[str]]], List[Tuple[Any, ...]]]:
+        """Function turning a batch of scraped rows into the normalized rows whose key is not in seen_keys yet."""
+        def ingest(batch: List[List[str]]) -> List[Tuple[Any, ...]]:
+            fresh = []
+            for row_cells in batch:
+                key = self._row_key(row_cells, key_index)
+                if key in seen_keys:
+                    continue
+                seen_keys.add(key)
+                fresh.append(self._normalize_cells(headers, row_cells))
+            return fresh
+        return ingest
+
+    def _harvest_while_scrolling(self, page: Page, headers: List[str], container, scroll_container: str,
+                                 target_count: Optional[int], key_column: Optional[str],
+                                 use_observer: bool = False,
+                                 stop_fraction: Optional[float] = None,
+                                 seed_rows: Optional[List[Tuple[Any, ...]]] = None) -> Iterator[Tuple[Any, ...]]:
+        """
+        Yield rows on every scroll step, keeping only rows whose key has not been seen.
+        Stops once the scroll position passes stop_fraction of the scroll height, if given.
+        seed_rows (restored from a checkpoint) are yielded first and count towards the target.
+        """
+        key_index = self._resolve_key_index(headers, key_column)
+        if key_index is not None:
+            logger.info(f"Deduplicating rows by column '{headers[key_index]}'")
+        else:
+            logger.info("No key column found, deduplicating rows by full content")
+
+        if use_observer and not self.install_row_observer(page):
+            logger.warning("Row observer unavailable, falling back to per-step harvesting")
+            use_observer = False
+
+        harvested = 0
+        position = 0.0
+        seen_keys: Set[Any] = set()
+        stagnant_rounds = 0
+        max_stagnant = 3
+        next_progress = 100
+        # Fixed strategy scrolls one viewport at a time so no rendered window is skipped;
+        # adaptive may stride further but is clamped to the last rendered row
+        controller = self.new_scroll_controller(viewports=1)
+
+        ingest = self._row_ingester(headers, key_index, seen_keys)
+
+        checkpoint = self.checkpoint if stop_fraction is None else None
+        for row in seed_rows or []:
+            key = self._row_key(list(row), key_index)
+            if key in seen_keys or (target_count and harvested >= target_count):
+                continue
+            seen_keys.add(key)
+            harvested += 1
+            yield row
+
+        while stagnant_rounds < max_stagnant:
+            # Round time excludes the time the consumer spends on yielded rows
+            round_start = time.time()
+            if use_observer:
+                # Drain, scroll and wait for mutations in a single call
+                step = self.drain_observed_rows(page, scroll_container, viewports=controller.viewports,
+                                                timeout_ms=controller.wait_ms,
+                                                clamp_to_rendered=controller.adaptive)
+                fresh = ingest(step["rows"])
+                grew, latency_ms, position = step["grew"], step["latency"], step["position"]
+            else:
+                fresh = ingest(self.harvest_rendered_rows(page))
+            round_seconds = time.time() - round_start
+            if checkpoint and fresh:
+                # Log rows before handing them on, so a crash downstream loses nothing
+                checkpoint.append(fresh)
+                checkpoint.update(position=position, last_key=self._row_key(list(fresh[-1]), key_index))
+            for row in fresh:
+                if target_count and harvested >= target_count:
+                    break
+                harvested += 1
+                yield row
+            if target_count and harvested >= target_count:
+                break
+            if stop_fraction is not None and stop_fraction < 1 and position >= stop_fraction:
+                break
+
+            if harvested >= next_progress:
+                logger.info(f"Progress: {harvested} rows harvested")
+                next_progress = (harvested // 100 + 1) * 100
+
+            if not use_observer:
+                scroll_start = time.time()
+                position = self._scroll_step(page, container, scroll_container, viewports=controller.viewports,
+                                             clamp_to_rendered=controller.adaptive)
+                wait_start = time.time()
+                grew = self.wait_for_new_rows(page, timeout_ms=controller.wait_ms)
+                latency_ms = (time.time() - wait_start) * 1000
+                round_seconds += time.time() - scroll_start
+            controller.record(len(fresh), latency_ms, grew)
+            self.record_scroll_round(round_seconds, len(fresh), grew)
+            if grew:
+                stagnant_rounds = 0
+            else:
+                stagnant_rounds += 1
+        self.scroll_stats = controller.summary()
+        self.harvest_complete = stagnant_rounds >= max_stagnant
+
+        if use_observer and not (target_count and harvested >= target_count):
+            # Pick up anything buffered after the last step
+            fresh = ingest(self.drain_observed_rows(page, scroll_container, viewports=0, timeout_ms=0)["rows"])
+            if checkpoint:
+                checkpoint.append(fresh)
+            for row in fresh:
+                if target_count and harvested >= target_count:
+                    break
+                harvested += 1
+                yield row
+        if checkpoint:
+            checkpoint.update(force=True, position=position)
+
+        logger.info(f" Harvested {harvested} unique rows")
+
+    def _clean_product(self, product: Dict[str, Any]) -> Dict[str, Any]:
+        """Make a row JSON-safe, copying it only when a value actually needs converting."""
+        if all(isinstance(v, (str, int, float, bool, type(None))) for v in product.values()):
+            return product
+        return {k: v if isinstance(v, (str, int, float, bool, type(None))) else str(v)
+                for k, v in product.items()}
+
+    def _clean_timed(self, product: Dict[str, Any]) -> Dict[str, Any]:
+        """_clean_product, adding the time it took to cleaning_seconds."""
+        start = time.perf_counter()
+        cleaned = self._clean_product(product)
+        self.cleaning_seconds += time.perf_counter() - start
+        return cleaned
+
+    def iter_product_data(self, target_count: int = 2332) -> Iterator[Dict]:
+        """Yield cleaned products as soon as they are harvested from the table."""
+        logger.info("Starting data extraction...")
+        for product in self.iter_table_rows(self.page, target_count=target_count,
+                                            harvest_mode=self.harvest_mode, key_column=self.key_column):
+            if isinstance(product, dict):
+                yield self._clean_timed(product)
+
+    def extract_product_table(self, target_count: int = 2332) -> ProductTable:
+        """Extract product data into a compact ProductTable; scraped cells are already JSON-safe."""
+        logger.info("Starting data extraction...")
+        table = self.scroll_table(self.page, target_count=target_count,
+                                  harvest_mode=self.harvest_mode, key_column=self.key_column)
+        logger.info(f"Total extracted: {len(table)}")
+        return table
 
     def extract_product_data(self, target_count: int = 2332) -> List[Dict]:
         """Extract product data using efficient infinite scroll strategy."""
         try:
-            logger.info("Starting data extraction...")
-            products = self.infinite_scroll_table(self.page, target_count=target_count)
-            clean_products = []
-            for product in products:
-                if isinstance(product, dict):
-                    clean_product = {}
-                    for k, v in product.items():
-                        if isinstance(v, (str, int, float, bool, type(None))):
-                            clean_product[k] = v
-                        else:
-                            clean_product[k] = str(v)
-                    clean_products.append(clean_product)
+            clean_products = list(self.iter_product_data(target_count=target_count))
             logger.info(f"Total extracted: {len(clean_products)}")
             return clean_products
         except Exception as e:
             logger.error(f"Data extraction failed: {e}")
             return []
 
-    def export_to_json(self, data: List[Dict]) -> None:
-        """Export extracted data to JSON file."""
+    def _extract_partition(self, partition: Tuple[float, float], headless: bool) -> Optional[ProductTable]:
+        """
+        Harvest one scroll partition in its own browser, restored from the saved session.
+        With an account pool, each worker leases its own account and logs in if its session is stale.
+        """
+        account = self.account_pool.acquire() if self.account_pool else None
+        if account:
+            worker = IdenUnifiedAutomation(account["credentials"], account["store"].path)
+            worker.session_store = account["store"]
+        else:
+            # A failing worker clears its own copy, not the session file the other workers restore from
+            worker = IdenUnifiedAutomation()
+            worker.session_store = self.session_store.snapshot()
+        worker.login_url, worker.challenge_url = self.login_url, self.challenge_url
+        worker.harvest_mode = self.harvest_mode
+        worker.scroll_strategy = self.scroll_strategy
+        worker.key_column = self.key_column
+        worker.use_browser_daemon = self.use_browser_daemon
+        worker.deep_link = self.deep_link
+        # Workers record into the run's metrics and call trace
+        worker.metrics = self.metrics
+        worker.call_tracer = self.call_tracer
+        worker.schema_cache = self.schema_cache
+        if self.resource_blocker:
+            worker.resource_blocker = ResourceBlocker(self.resource_blocker.profile)
+        ok = False
+        try:
+            if not worker.setup_browser(headless) and not (account and worker.authenticate()):
+                logger.error(f"Partition {partition}: saved session could not be restored")
+                return None
+            worker.trace_page()
+            if not worker.navigate_hidden_path(worker.page):
+                logger.error(f"Partition {partition}: navigation failed")
+                return None
+            table = worker.scroll_table(worker.page, harvest_mode=worker.harvest_mode,
+                                        key_column=worker.key_column, partition=partition)
+            ok = True
+            return table
+        except Exception as e:
+            logger.error(f"Partition {partition} failed: {e}")
+            return None
+        finally:
+            worker.cleanup_browser_resources()
+            if worker.resource_blocker:
+                self.resource_blocker.merge(worker.resource_blocker)
+            if account:
+                self.account_pool.release(account, ok)
+
+    def _reauthenticate_account(self, account: Dict[str, Any], headless: bool) -> bool:
+        """
+        Log a pooled account in with its own short-lived browser, saving a fresh session to its store.
+        The saved session is deliberately not restored: it is still valid, just about to expire.
+        """
+        worker = IdenUnifiedAutomation(account["credentials"], account["store"].path)
+        worker.session_store = account["store"]
+        worker.login_url, worker.challenge_url = self.login_url, self.challenge_url
+        try:
+            worker.setup_browser(headless, restore=False)
+            return worker.authenticate()
+        finally:
+            worker.cleanup_browser_resources()
+
+    def _acquire_pool_account(self, headless: bool) -> None:
+        """Lease the run's own account from the pool and start refreshing the others in the background."""
+        self.pool_account = self.account_pool.acquire()
+        self.credentials = self.pool_account["credentials"]
+        self.session_store = self.pool_account["store"]
+        print(f"Using pooled account {self.credentials['username']} "
+              f"({len(self.account_pool.accounts)} accounts in pool)")
+        self.account_pool.start_refresher(lambda account: self._reauthenticate_account(account, headless))
+
+    def _release_pool_account(self, ok: bool = True) -> None:
+        if self.pool_account:
+            self.account_pool.release(self.pool_account, ok)
+            self.pool_account = None
+
+    def extract_product_data_parallel(self, workers: int, target_count: int = 2332,
+                                      headless: bool = False) -> ProductTable:
+        """
+        Split the table's scroll height into equal partitions and harvest them concurrently,
+        one browser per worker thread (Playwright's sync API is per-thread), all restored
+        from the saved session. Partitions overlap by a viewport; rows are merged and
+        deduplicated by the key column.
+        """
+        logger.info(f"Starting parallel extraction with {workers} workers...")
+        partitions = [(i / workers, (i + 1) / workers) for i in range(workers)]
+        results: Dict[Tuple[float, float], Optional[ProductTable]] = {}
+        pending = partitions
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for attempt in range(2):
+                for part, table in zip(pending, executor.map(lambda part: self._extract_partition(part, headless),
+                                                             pending)):
+                    results[part] = table
+                pending = [part for part in partitions if results[part] is None or not results[part].headers]
+                if not pending:
+                    break
+                if not attempt:
+                    logger.warning(f"{len(pending)} of {workers} partitions failed, retrying them")
+        if pending:
+            # Exporting the other partitions would silently drop a slice of the table
+            raise Exception(f"{len(pending)} of {workers} partitions failed, table would be incomplete")
+        tables = [results[part] for part in partitions]
+
+        return self._merge_partitions(tables, target_count)
+
+    def _merge_partitions(self, tables: List[ProductTable], target_count: Optional[int]) -> ProductTable:
+        """Concatenate partition tables in order, dropping rows whose key an earlier partition already had."""
+        merged = ProductTable(tables[0].headers)
+        self.table_headers = list(merged.headers)
+        key_index = self._resolve_key_index(self.table_headers, self.key_column)
+        seen_keys: Set[Any] = set()
+        for table in tables:
+            for row in table.rows:
+                key = self._row_key(list(row), key_index)
+                if key not in seen_keys:
+                    seen_keys.add(key)
+                    merged.append(row)
+        # Every partition ran to its end, so the merge is the whole table unless the target cuts it
+        self.harvest_complete = not (target_count and len(merged) > target_count)
+        if target_count:
+            merged.rows = merged.rows[:target_count]
+        logger.info(f"Merged {len(merged)} unique rows from {len(tables)} partitions")
+        return merged
+
+    def start_response_capture(self, page: Page) -> None:
+        """
+        Record JSON XHR/fetch responses that carry a list of records.
+        Must be called before navigation so the requests that fill the table are seen.
+        """
+        self.captured_payloads = []
+
+        def on_response(response):
+            try:
+                request = response.request
+                if request.resource_type not in ("xhr", "fetch") or not response.ok:
+                    return
+                if "json" not in (response.headers.get("content-type") or ""):
+                    return
+                payload = response.json()
+            except Exception:
+                return
+            found = self._find_record_list(payload)
+            if found:
+                records_path, records = found
+                self.captured_payloads.append({
+                    "url": response.url,
+                    "method": request.method,
+                    "headers": request.headers,
+                    "post_data": request.post_data,
+                    "records_path": records_path,
+                    "payload": payload,
+                    "record_count": len(records),
+                })
+                logger.info(f"Captured {len(records)} records from {response.url}")
+
+        page.on("response", on_response)
+
+    def _find_record_list(self, payload: Any, depth: int = 0) -> Optional[Tuple[str, List[Dict]]]:
+        """Locate the largest list of objects in a JSON payload. Returns (dotted path, records)."""
+        if isinstance(payload, list):
+            if payload and all(isinstance(item, dict) for item in payload[:20]):
+                return "", payload
+            return None
+        if isinstance(payload, dict) and depth < 3:
+            best = None
+            for key, value in payload.items():
+                found = self._find_record_list(value, depth + 1)
+                if found and (best is None or len(found[1]) > len(best[1])):
+                    best = (f"{key}.{found[0]}" if found[0] else key, found[1])
+            return best
+        return None
+
+    def _records_at(self, payload: Any, records_path: str) -> List[Dict]:
+        """Read the record list from a payload using the path found on the first page."""
+        for part in filter(None, records_path.split(".")):
+            if not isinstance(payload, dict):
+                return []
+            payload = payload.get(part)
+        return payload if isinstance(payload, list) else []
+
+    def _next_page_url(self, url: str, payload: Any, record_count: int) -> Optional[str]:
+        """Work out the next page URL from next-links, cursors, or page/offset query parameters."""
+        if isinstance(payload, dict):
+            for key in ("next", "next_page", "nextPage", "next_url"):
+                if isinstance(payload.get(key), str) and payload[key]:
+                    return urljoin(url, payload[key])
+            for key in ("nextCursor", "next_cursor"):
+                if payload.get(key):
+                    return self._with_query(url, {"cursor": payload[key]})
+
+        query = parse_qs(urlparse(url).query)
+        for name in ("page", "pageNumber", "page_number", "p"):
+            if name in query and query[name][0].isdigit():
+                return self._with_query(url, {name: int(query[name][0]) + 1})
+        for name in ("offset", "skip", "start", "from"):
+            if name in query and query[name][0].isdigit():
+                return self._with_query(url, {name: int(query[name][0]) + record_count})
+        return None
+
+    def _with_query(self, url: str, updates: Dict[str, Any]) -> str:
+        """Return url with the given query parameters replaced."""
+        parsed = urlparse(url)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        query.update({k: str(v) for k, v in updates.items()})
+        return urlunparse(parsed._replace(query=urlencode(query)))
+
+    def _payload_total(self, payload: Any) -> Optional[int]:
+        """Total record count advertised by the API, if any."""
+        if isinstance(payload, dict):
+            for key in ("total", "totalCount", "total_count", "count"):
+                if isinstance(payload.get(key), int):
+                    return payload[key]
+        return None
+
+    def _record_key(self, record: Dict[str, Any]) -> Any:
+        """Stable key for an API record: its id field, otherwise its full content."""
+        for key in ("id", "_id", "productId", "product_id", "sku"):
+            if record.get(key) is not None:
+                return record[key]
+        return json.dumps(record, sort_keys=True, default=str)
+
+    def _record_to_product(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Flatten an API record into JSON-safe scalar values."""
+        product = {}
+        for k, v in record.items():
+            if isinstance(v, (str, int, float, bool, type(None))):
+                product[k] = v
+            else:
+                product[k] = json.dumps(v, ensure_ascii=False, default=str)
+        return product
+
+    def extract_product_data_network(self, target_count: int = 2332, wait_ms: int = 5000) -> List[Dict]:
+        """
+        Extract product data from the JSON API that feeds the table instead of the DOM.
+        Uses the responses captured by start_response_capture, then follows the API's
+        pagination directly. Falls back to extract_product_data if no usable response was seen.
+        Products keep the API's field names rather than the table headers.
+        """
+        try:
+            logger.info("Starting network extraction...")
+            deadline = time.time() + wait_ms / 1000
+            while not self.captured_payloads and time.time() < deadline:
+                self.page.wait_for_timeout(250)
+            if not self.captured_payloads:
+                logger.warning("No product API response captured, falling back to DOM extraction")
+                return self.extract_product_data(target_count=target_count)
+
+            # Use the endpoint that delivered the most records
+            totals: Dict[str, int] = {}
+            for capture in self.captured_payloads:
+                path = urlparse(capture["url"]).path
+                totals[path] = totals.get(path, 0) + capture["record_count"]
+            best_path = max(totals, key=totals.get)
+            captures = [c for c in self.captured_payloads if urlparse(c["url"]).path == best_path]
+            template = captures[-1]
+            self.api_template = {k: v for k, v in template.items() if k not in ("payload", "record_count")}
+            self.api_template["first_url"] = captures[0]["url"]
+
+            products = []
+            seen_keys: Set[Any] = set()
+
+            def ingest(records: List[Dict]) -> int:
+                added = 0
+                for record in records:
+                    key = self._record_key(record)
+                    if key in seen_keys:
+                        continue
+                    seen_keys.add(key)
+                    products.append(self._record_to_product(record))
+                    added += 1
+                return added
+
+            for capture in captures:
+                ingest(self._records_at(capture["payload"], capture["records_path"]))
+
+            headers = {k: v for k, v in template["headers"].items()
+                       if not k.startswith(":") and k.lower() not in ("host", "content-length")}
+            url, payload = template["url"], template["payload"]
+            page_records = template["record_count"]
+            total = self._payload_total(payload)
+            visited = {c["url"] for c in captures}
+            exhausted = False
+
+            while not (target_count and len(products) >= target_count) and not (total and len(products) >= total):
+                next_url = self._next_page_url(url, payload, page_records)
+                if not next_url or next_url in visited:
+                    exhausted = True
+                    break
+                visited.add(next_url)
+                response = self.context.request.fetch(
+                    next_url, method=template["method"], headers=headers, data=template["post_data"]
+                )
+                if not response.ok:
+                    logger.warning(f"API page request failed with status {response.status}: {next_url}")
+                    break
+                payload = response.json()
+                records = self._records_at(payload, template["records_path"])
+                page_records = len(records)
+                if not records or ingest(records) == 0:
+                    exhausted = True
+                    break
+                url = next_url
+                logger.info(f"Progress: {len(products)} products fetched")
+
+            if not products:
+                logger.warning("Product API returned no records, falling back to DOM extraction")
+                return self.extract_product_data(target_count=target_count)
+            self.harvest_complete = ((exhausted or bool(total and len(products) >= total))
+                                     and not (target_count and len(products) > target_count))
+            if target_count:
+                products = products[:target_count]
+            logger.info(f"Total extracted from API: {len(products)}")
+            return products
+        except Exception as e:
+            logger.error(f"Network extraction failed: {e}, falling back to DOM extraction")
+            return self.extract_product_data(target_count=target_count)
+
+    def save_api_template(self) -> None:
+        """
+        Save the captured product API request so later runs can replay it without a browser.
+        Records which sessionStorage key holds the auth token so the header can be refreshed.
+        """
+        if not self.api_template:
+            return
+        try:
+            template = dict(self.api_template)
+            template["auth_token_key"] = None
+            try:
+                session_storage = self.page.evaluate(SESSION_STORAGE_JS)
+                for key, value in session_storage.items():
+                    if value and len(value) >= 16 and any(value in h for h in template["headers"].values()):
+                        # Store the header as a placeholder so replay can insert the current token
+                        template["auth_token_key"] = key
+                        template["headers"] = {h: v.replace(value, "{auth_token}")
+                                               for h, v in template["headers"].items()}
+                        break
+            except Exception:
+                pass
+            with open(self.api_template_file, "w", encoding="utf-8") as f:
+                json.dump(template, f, indent=2, ensure_ascii=False)
+            logger.info(f"API request template saved to {self.api_template_file}")
+        except Exception as e:
+            logger.warning(f"Failed to save API template: {e}")
+
+    def _replay_headers(self, template: Dict[str, Any]) -> Dict[str, str]:
+        """Rebuild request headers from the template, the saved cookies and the current auth token."""
+        headers = {k: v for k, v in template["headers"].items()
+                   if not k.startswith(":") and k.lower() not in ("host", "content-length", "accept-encoding", "cookie")}
+        headers["Accept-Encoding"] = "gzip"
+        headers["Connection"] = "keep-alive"
+
+        host = urlparse(template["url"]).hostname or ""
+
+        def domain_matches(domain: str) -> bool:
+            # Match on a label boundary: "example.com" covers "api.example.com", not "badexample.com"
+            domain = domain.lstrip(".")
+            return bool(domain) and (host == domain or host.endswith("." + domain))
+
+        cookies = [f"{c['name']}={c['value']}" for c in self.session_store.storage_state.get("cookies", [])
+                   if domain_matches(c.get("domain", ""))]
+        if cookies:
+            headers["Cookie"] = "; ".join(cookies)
+
+        token_key = template.get("auth_token_key")
+        if token_key:
+            token = self.session_store.session_storage.get(token_key)
+            if token:
+                headers = {k: v.replace("{auth_token}", token) for k, v in headers.items()}
+        return headers
+
+    def extract_via_http_replay(self, target_count: int = 2332) -> Optional[List[Dict]]:
+        """
+        Fetch products by replaying the saved API request template with a pooled HTTP client.
+        Page/offset-paginated APIs are fetched concurrently in waves; cursor APIs sequentially.
+        Returns None when replay is not possible, the saved tokens are rejected or a page keeps
+        failing (429/5xx are retried), so the caller can fall back to the browser rather than
+        export a truncated table. Only an empty page or a missing next link ends pagination.
+        """
+        if not os.path.exists(self.api_template_file) or not self.has_valid_session_files():
+            logger.info("No API template or session saved, replay not possible")
+            return None
+
+        pool = KeepAliveHTTPPool()
+        try:
+            with open(self.api_template_file, "r", encoding="utf-8") as f:
+                template = json.load(f)
+            headers = self._replay_headers(template)
+            method, body, records_path = template["method"], template.get("post_data"), template["records_path"]
+
+            def fetch(url: str) -> Any:
+                """Parsed JSON of a 2xx response; raises once retries are used up or the session is rejected."""
+                for attempt in range(REPLAY_RETRIES + 1):
+                    status, data = pool.request(method, url, headers, body)
+                    if status in (401, 403):
+                        raise PermissionError(f"API rejected saved session (HTTP {status})")
+                    if 200 <= status < 300:
+                        return json.loads(data)
+                    if (status != 429 and status < 500) or attempt == REPLAY_RETRIES:
+                        break
+                    logger.warning(f"API page request returned HTTP {status}, retrying: {url}")
+                    time.sleep(0.5 * 2 ** attempt)
+                raise Exception(f"API page request failed with status {status}: {url}")
+
+            products = []
+            seen_keys: Set[Any] = set()
+
+            def ingest(records: List[Dict]) -> int:
+                added = 0
+                for record in records:
+                    key = self._record_key(record)
+                    if key in seen_keys:
+                        continue
+                    seen_keys.add(key)
+                    products.append(self._record_to_product(record))
+                    added += 1
+                return added
+
+            def done() -> bool:
+                return bool(target_count and len(products) >= target_count)
+
+            url = template.get("first_url", template["url"])
+            payload = fetch(url)
+            first_records = self._records_at(payload, records_path)
+            ingest(first_records)
+            page_size = len(first_records)
+
+            if self._next_page_url(url, None, page_size) and page_size:
+                # Query-paginated: fetch the next pages concurrently, one wave per round
+                with ThreadPoolExecutor(max_workers=self.replay_workers) as executor:
+                    while not done():
+                        wave = []
+                        for _ in range(self.replay_workers):
+                            url = self._next_page_url(url, None, page_size)
+                            wave.append(url)
+                        pages = list(executor.map(fetch, wave))
+                        short_page = False
+                        for page_payload in pages:
+                            records = self._records_at(page_payload, records_path) if page_payload else []
+                            ingest(records)
+                            if len(records) < page_size:
+                                short_page = True
+                        if short_page:
+                            break
+            else:
+                # Link or cursor pagination: each page depends on the previous one
+                visited = {url}
+                while not done():
+                    next_url = self._next_page_url(url, payload, len(first_records))
+                    if not next_url or next_url in visited:
+                        break
+                    visited.add(next_url)
+                    payload = fetch(next_url)
+                    first_records = self._records_at(payload, records_path) if payload else []
+                    if not first_records or ingest(first_records) == 0:
+                        break
+                    url = next_url
+
+            if not products:
+                return None
+            if target_count:
+                products = products[:target_count]
+            logger.info(f"Total fetched by HTTP replay: {len(products)}")
+            return products
+        except PermissionError as e:
+            logger.warning(f"{e}, falling back to browser")
+            return None
+        except Exception as e:
+            logger.warning(f"HTTP replay failed: {e}, falling back to browser")
+            return None
+        finally:
+            pool.close()
+
+    def export_products(self, products: Union[ProductTable, Iterable[Dict]]) -> int:
+        """Export products in the configured output format. Returns the number of products written, 0 if the write failed."""
+        if self.output_format in STREAMING_FORMATS:
+            return self.export_stream(products, fmt=self.output_format)
+        products = products if isinstance(products, (list, ProductTable)) else list(products)
+        if self.output_format == "csv":
+            written = self.export_to_csv(products)
+        elif self.output_format == "parquet":
+            written = self.export_to_parquet(products)
+        elif self.output_format == "arrow":
+            written = self.export_to_arrow(products)
+        else:
+            written = self.export_to_json(products)
+        return len(products) if written else 0
+
+    def _parse_number(self, value: str) -> Optional[float]:
+        """Parse numbers such as "1,234", "$12.99" or "-3.5"; None if the text is not numeric."""
+        text = re.sub(r"^[-+]?\s*[$€£¥]\s*|[,\s]", "", value.strip())
+        if value.strip().startswith("-") and not text.startswith("-"):
+            text = "-" + text
+        if not re.match(r"^[-+]?\d+(\.\d+)?$", text):
+            return None
+        return float(text)
+
+    def _looks_like_code(self, value: str) -> bool:
+        """Numeric text that is really an identifier: converting it would drop leading zeros or digits."""
+        digits = value.strip().lstrip("+-")
+        return bool(re.match(r"^0\d", digits)) or len(re.sub(r"\D", "", digits)) > 15
+
+    def _parse_date(self, value: str, formats: Tuple[str, ...]) -> Optional[str]:
+        """Return the first format that parses value, or None."""
+        for fmt in formats:
+            try:
+                datetime.strptime(value.strip(), fmt)
+                return fmt
+            except ValueError:
+                continue
+        return None
+
+    def _columns_of(self, data: Union[ProductTable, List[Dict]]) -> Dict[str, List[Any]]:
+        """Column-oriented view of products, straight from a ProductTable or built from dicts."""
+        if isinstance(data, ProductTable):
+            return data.columns()
+        names = list(data[0].keys()) if data else []
+        return {name: [row.get(name) for row in data] for name in names}
+
+    def infer_column_types(self, data: Union[ProductTable, List[Dict]],
+                           columns: Optional[Dict[str, List[Any]]] = None) -> Dict[str, Tuple[str, Optional[str]]]:
+        """
+        Infer a type per column from the scraped string values.
+        Returns {column: (type, date_format)} with type one of int, float, date, datetime, bool, string.
+        A column gets a type only if every non-empty value parses as that type. Digit codes
+        with leading zeros or more than 15 digits (SKUs, zip codes) stay strings.
+        """
+        columns = columns if columns is not None else self._columns_of(data)
+        types = {}
+        for column, column_values in columns.items():
+            values = [v for v in column_values if v is not None and v != ""]
+            if not values:
+                types[column] = ("string", None)
+            elif all(isinstance(v, bool) or str(v).lower() in ("true", "false") for v in values):
+                types[column] = ("bool", None)
+            elif all(isinstance(v, (int, float)) or (isinstance(v, str) and self._parse_number(v) is not None
+                                                     and not self._looks_like_code(v))
+                     for v in values):
+                numbers = [v if isinstance(v, (int, float)) else self._parse_number(v) for v in values]
+                is_int = all(float(n).is_integer() for n in numbers) and \
+                    not any(isinstance(v, str) and "." in v for v in values)
+                types[column] = ("int" if is_int else "float", None)
+            elif all(isinstance(v, str) for v in values):
+                date_format = self._parse_date(values[0], DATE_FORMATS)
+                datetime_format = self._parse_date(values[0], DATETIME_FORMATS)
+                if date_format and all(self._parse_date(v, (date_format,)) for v in values):
+                    types[column] = ("date", date_format)
+                elif datetime_format and all(self._parse_date(v, (datetime_format,)) for v in values):
+                    types[column] = ("datetime", datetime_format)
+                else:
+                    types[column] = ("string", None)
+            else:
+                types[column] = ("string", None)
+        return types
+
+    def _typed_value(self, value: Any, column_type: Tuple[str, Optional[str]]) -> Any:
+        """Convert one scraped value to its inferred column type."""
+        if value is None or value == "":
+            return None
+        kind, fmt = column_type
+        if kind == "bool":
+            return value if isinstance(value, bool) else str(value).lower() == "true"
+        if kind in ("int", "float"):
+            number = value if isinstance(value, (int, float)) else self._parse_number(value)
+            return int(number) if kind == "int" else float(number)
+        if kind == "date":
+            return datetime.strptime(value.strip(), fmt).date()
+        if kind == "datetime":
+            return datetime.strptime(value.strip(), fmt)
+        return value if isinstance(value, str) else str(value)
+
+    def _typed_columns(self, data: Union[ProductTable, List[Dict]]) -> Tuple[Dict[str, Tuple[str, Optional[str]]], Dict[str, List[Any]]]:
+        """Infer column types and convert the rows into typed column lists."""
+        raw_columns = self._columns_of(data)
+        types = self.infer_column_types(data, columns=raw_columns)
+        columns = {name: [self._typed_value(v, types[name]) for v in values]
+                   for name, values in raw_columns.items()}
+        logger.info(f"Inferred column types: {', '.join(f'{k}={v[0]}' for k, v in types.items())}")
+        return types, columns
+
+    def export_to_csv(self, data: Union[ProductTable, List[Dict]]) -> bool:
+        """Export products to CSV with typed values (plain numbers, ISO dates). Returns False if the write failed."""
+        try:
+            types, columns = self._typed_columns(data)
+            names = list(types)
+            with open(self.output_file, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(names)
+                for i in range(len(data)):
+                    row = []
+                    for name in names:
+                        value = columns[name][i]
+                        row.append(value.isoformat() if hasattr(value, "isoformat") else value)
+                    writer.writerow(row)
+            logger.info(f"Data exported successfully to {self.output_file}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to export data: {e}")
+            return False
+
+    def _arrow_table(self, data: Union[ProductTable, List[Dict]]):
+        """Build a typed pyarrow Table from the products."""
+        arrow_types = {"int": pa.int64(), "float": pa.float64(), "date": pa.date32(),
+                       "datetime": pa.timestamp("us"), "bool": pa.bool_(), "string": pa.string()}
+        types, columns = self._typed_columns(data)
+        schema = pa.schema([(name, arrow_types[kind]) for name, (kind, _) in types.items()])
+        return pa.Table.from_pydict(columns, schema=schema)
+
+    def export_to_parquet(self, data: Union[ProductTable, List[Dict]]) -> bool:
+        """Export products to a Parquet file with typed columns (requires pyarrow). Returns False if the write failed."""
+        if pa is None:
+            logger.error("pyarrow is not installed, cannot export Parquet")
+            return False
+        try:
+            pq.write_table(self._arrow_table(data), self.output_file)
+            logger.info(f"Data exported successfully to {self.output_file}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to export data: {e}")
+            return False
+
+    def export_to_arrow(self, data: Union[ProductTable, List[Dict]]) -> bool:
+        """Export products to an Arrow IPC file with typed columns (requires pyarrow). Returns False if the write failed."""
+        if pa is None:
+            logger.error("pyarrow is not installed, cannot export Arrow IPC")
+            return False
+        try:
+            table = self._arrow_table(data)
+            with pa.OSFile(self.output_file, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            logger.info(f"Data exported successfully to {self.output_file}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to export data: {e}")
+            return False
+
+    def export_stream(self, rows: Iterable[Dict], fmt: str = "ndjson", flush_every: int = 100) -> int:
+        """
+        Write rows to the output file as they arrive instead of building the whole document first.
+        "ndjson" writes one product per line; "json-stream" writes the export_to_json envelope
+        with the products array emitted in chunks (total_products comes after the array).
+        Returns the number of rows written. If the harvest fails part-way, the rows written
+        so far are kept in a closed document and the error is re-raised, so the run fails
+        (and keeps its checkpoint) instead of reporting a truncated export as complete.
+        """
+        count = 0
+        with open(self.output_file, "w", encoding="utf-8") as f:
+            f.write(self._stream_header(fmt))
+            try:
+                for row in rows:
+                    f.write(self._stream_line(row, count, fmt))
+                    count += 1
+                    if count % flush_every == 0:
+                        f.flush()
+            except Exception as e:
+                logger.error(f"Extraction failed while streaming after {count} rows: {e}")
+                raise
+            finally:
+                # Keep what was already written and still close the document
+                f.write(self._stream_footer(count, fmt))
+        logger.info(f"Streamed {count} products to {self.output_file} ({fmt})")
+        return count
+
+    def _stream_header(self, fmt: str) -> str:
+        """Text written before the first streamed row."""
+        if fmt != "json-stream":
+            return ""
+        return ("{\n"
+                f'  "extraction_timestamp": {json.dumps(time.strftime("%Y-%m-%d %H:%M:%S"))},\n'
+                f'  "target_products": {self.target_count},\n'
+                '  "products": [')
+
+    def _stream_line(self, row: Dict, index: int, fmt: str) -> str:
+        """Serialized form of one streamed row."""
+        line = json.dumps(row, ensure_ascii=False)
+        if fmt == "json-stream":
+            return (",\n    " if index else "\n    ") + line
+        return line + "\n"
+
+    def _stream_footer(self, count: int, fmt: str) -> str:
+        """Text written after the last streamed row."""
+        if fmt != "json-stream":
+            return ""
+        return f'\n  ],\n  "total_products": {count}\n}}\n'
+
+    def _product_digest(self, product: Dict[str, Any]) -> str:
+        """Short content fingerprint used to detect changed products."""
+        return hashlib.sha1(json.dumps(product, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+    def _product_key_column(self, columns: List[str]) -> Optional[str]:
+        """Column identifying a product across runs: --key-column, else an ID-like header."""
+        key_index = self._resolve_key_index(columns, self.key_column)
+        return columns[key_index] if key_index is not None else None
+
+    def load_delta_index(self, path: str) -> Dict[str, Any]:
+        """
+        Load {"key_column", "rows": {key: digest}} for the baseline. Accepts a saved
+        *.index.json, or a previous json / json-stream / ndjson output that is indexed on the fly.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".ndjson"):
+                products = [json.loads(line) for line in f if line.strip()]
+            else:
+                data = json.load(f)
+                if "rows" in data and "key_column" in data:
+                    return data
+                products = data.get("products", []) if isinstance(data, dict) else data
+        key_column = self._product_key_column(list(products[0].keys())) if products else None
+        rows = {}
+        for i, product in enumerate(products):
+            key = str(product.get(key_column)) if key_column else str(i)
+            rows[key] = self._product_digest(product)
+        logger.info(f"Indexed {len(rows)} baseline products from {path} (key: {key_column})")
+        return {"key_column": key_column, "rows": rows}
+
+    def export_delta(self, products: Iterable[Dict]) -> int:
+        """
+        Compare harvested products against the baseline index and write only the added and
+        changed products plus the keys of removed ones. Removals are only reported when the
+        harvest reached the end of the table (scroll stagnation, or the API's reported total).
+        With delta_stop_after > 0, harvesting stops after that many consecutive unchanged
+        products (for tables sorted by update time), so removals are then unknown.
+        Also writes an updated index for the next run.
+        Returns the number of products in the delta.
+        """
+        baseline = self.load_delta_index(self.delta_from)
+        previous = baseline["rows"]
+        key_column = baseline["key_column"]
+        if not key_column:
+            logger.warning("Baseline has no key column, products are matched by position")
+
+        added, changed = [], []
+        seen: Set[str] = set()
+        unchanged = consecutive_unchanged = scanned = 0
+        stopped_early = False
+        index = dict(previous)
+        for product in products:
+            key = str(product.get(key_column)) if key_column else str(scanned)
+            scanned += 1
+            seen.add(key)
+            digest = self._product_digest(product)
+            if key not in previous:
+                added.append(product)
+                consecutive_unchanged = 0
+            elif previous[key] != digest:
+                changed.append(product)
+                consecutive_unchanged = 0
+            else:
+                unchanged += 1
+                consecutive_unchanged += 1
+                if self.delta_stop_after and consecutive_unchanged >= self.delta_stop_after:
+                    logger.info(f"Reached {consecutive_unchanged} unchanged products in a row, stopping early")
+                    stopped_early = True
+                    break
+            index[key] = digest
+
+        # Read after the loop: the harvest generator sets harvest_complete once it is exhausted
+        complete_scan = not stopped_early and self.harvest_complete
+        removed = [key for key in previous if key not in seen] if complete_scan else []
+        for key in removed:
+            del index[key]
+
+        delta = {
+            "extraction_timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "baseline": self.delta_from,
+            "key_column": key_column,
+            "complete_scan": complete_scan,
+            "scanned_products": scanned,
+            "unchanged_products": unchanged,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+        }
+        atomic_write_json(self.output_file, delta)
+        index_file = os.path.splitext(self.output_file)[0] + ".index.json"
+        atomic_write_json(index_file, {"key_column": key_column, "rows": index}, indent=None)
+        logger.info(f"Delta exported to {self.output_file}: {len(added)} added, {len(changed)} changed, "
+                    f"{len(removed)} removed; index saved to {index_file}")
+        print(f"Delta: {len(added)} added, {len(changed)} changed, {len(removed)} removed "
+              f"({unchanged} unchanged{', stopped early' if stopped_early else ''})")
+        return len(added) + len(changed) + len(removed)
+
+    @metric_span("export_to_json")
+    def export_to_json(self, data: Union[ProductTable, List[Dict]]) -> bool:
+        """Export extracted data to JSON file. Returns False if the write failed."""
         try:
             output = {
                 "extraction_timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
                 "total_products": len(data),
-                "target_products": 2332,
-                "products": data
+                "target_products": self.target_count,
+                # Compact tables only become dicts here, at export time
+                "products": data.to_dicts() if isinstance(data, ProductTable) else data
             }
             with open(self.output_file, 'w', encoding='utf-8') as f:
                 json.dump(output, f, indent=2, ensure_ascii=False)
             logger.info(f"Data exported successfully to {self.output_file}")
+            return True
         except Exception as e:
             logger.error(f"Failed to export data: {e}")
+            return False
 
     def check_session_status(self) -> Dict[str, Any]:
         """Check current session status for debugging."""
@@ -604,14 +3081,22 @@ class IdenUnifiedAutomation:
             return {"error": f"Debug failed: {str(e)}"}
 
     def cleanup_browser_resources(self):
-        """Clean up browser resources."""
+        """Clean up browser resources. When attached to the daemon, only our own page is closed."""
+        if self.traced_context is not None and self.traced_context is self.context:
+            try:
+                self.context.tracing.stop(path=self.playwright_trace)
+                print(f"Playwright trace written to {self.playwright_trace} (open with: playwright show-trace)")
+            except Exception as e:
+                logger.warning(f"Failed to save Playwright trace: {e}")
         try:
-            if self.page:
+            if self.page and not self.page.is_closed():
                 self.page.close()
-            if self.context:
-                self.context.close()
-            if self.browser:
-                self.browser.close()
+            # Leave the daemon's context and browser running; stopping the driver just disconnects
+            if not self.attached:
+                if self.context:
+                    self.context.close()
+                if self.browser:
+                    self.browser.close()
             if hasattr(self, "pw") and self.pw:
                 self.pw.stop()
             logger.info("Browser resources cleaned up")
@@ -624,51 +3109,20 @@ class IdenUnifiedAutomation:
             print("\nDETAILED SESSION STATUS:")
             print("=" * 50)
             
-            # Check main session file
-            if os.path.exists(self.session_file):
-                size = os.path.getsize(self.session_file)
-                print(f"Main session file: {self.session_file} ({size} bytes)")
-                if size > 20:
-                    with open(self.session_file, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        cookies_count = len(data.get("cookies", []))
-                        origins_count = len(data.get("origins", []))
-                        print(f"Cookies: {cookies_count}")
-                        print(f"Origins: {origins_count}")
-                else:
-                    print("File too small (likely empty)")
-            else:
-                print(f"Main session file: {self.session_file} (not found)")
-            
-            # Check sessionStorage file
-            if os.path.exists("session_storage.json"):
-                size = os.path.getsize("session_storage.json")
-                print(f"SessionStorage file: session_storage.json ({size} bytes)")
-                if size > 10:
-                    with open("session_storage.json", "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        print(f"Keys: {len(data)}")
-                        if data:
-                            print(f"Sample keys: {list(data.keys())[:5]}")
-                else:
-                    print("File too small (likely empty)")
+            store = self.session_store
+            if not store.load():
+                print(f"Session file: {store.path} (not found)")
             else:
-                print("SessionStorage file: session_storage.json (not found)")
-            
-            # Check localStorage file
-            if os.path.exists("local_storage.json"):
-                size = os.path.getsize("local_storage.json")
-                print(f"LocalStorage file: local_storage.json ({size} bytes)")
-                if size > 10:
-                    with open("local_storage.json", "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        print(f"Keys: {len(data)}")
-                        if data:
-                            print(f"Sample keys: {list(data.keys())[:5]}")
-                else:
-                    print("File too small (likely empty)")
-            else:
-                print("LocalStorage file: local_storage.json (not found)")
+                print(f"Session file: {store.path} ({os.path.getsize(store.path)} bytes)")
+                print(f"Saved at: {datetime.fromtimestamp(store.data['saved_at']).isoformat(timespec='seconds')}")
+                if store.expires_at:
+                    print(f"Expires at: {datetime.fromtimestamp(store.expires_at).isoformat(timespec='seconds')}")
+                print(f"Cookies: {len(store.storage_state.get('cookies', []))}")
+                print(f"Origins: {len(store.storage_state.get('origins', []))}")
+                for label, data in (("SessionStorage", store.session_storage), ("LocalStorage", store.local_storage)):
+                    print(f"{label} keys: {len(data)}")
+                    if data:
+                        print(f"Sample keys: {list(data.keys())[:5]}")
             
             print("=" * 50)
             
@@ -689,18 +3143,13 @@ class IdenUnifiedAutomation:
     def print_session_info(self, after: str = "check"):
         """Unified method to load and display session information."""
         session_status = self.check_session_status()
-        session_data = None
+        session_data = self.session_store.session_storage or None
         
-        if os.path.exists("session_storage.json"):
-            try:
-                with open("session_storage.json", "r", encoding="utf-8") as f:
-                    session_data = json.load(f)
-                if after == "login":
-                    print(f"Saved {len(session_data)} sessionStorage keys")
-                elif after == "restore":
-                    print(f"SessionStorage: {len(session_data)} keys restored")
-            except Exception as e:
-                logger.warning(f"Failed to read sessionStorage: {e}")
+        if session_data:
+            if after == "login":
+                print(f"Saved {len(session_data)} sessionStorage keys")
+            elif after == "restore":
+                print(f"SessionStorage: {len(session_data)} keys restored")
         else:
             if after == "login":
                 print("Failed to save sessionStorage")
@@ -712,16 +3161,43 @@ class IdenUnifiedAutomation:
     def run(self, headless: bool = False, target_count: int = 2332) -> bool:
         """Main execution method."""
         start_time = time.time()
+        self.target_count = target_count
+        self.headless = headless
         try:
             print("Starting Iden Challenge Unified Automation")
             logger.info("Starting Iden Challenge Unified Automation")
+            if self.account_pool:
+                self._acquire_pool_account(headless)
 
             # Show initial session status
             print("\nCHECKING EXISTING SESSION FILES")
             self.show_detailed_session_info()
 
+            if self.replay:
+                print("Replaying saved API requests without a browser...")
+                with self.timed_phase("http_replay"):
+                    products = self.extract_via_http_replay(target_count=target_count)
+                if products:
+                    print(f"Extracted {len(products)} products")
+                    print(f"Exporting data ({self.output_format})")
+                    with self.timed_phase("export"):
+                        product_count = self.export_products(products)
+                    if not product_count:
+                        raise Exception("Export failed")
+                    execution_time = time.time() - start_time
+                    print(f"Automation completed successfully in {execution_time:.1f} seconds")
+                    print(f"Performance: {product_count/execution_time:.1f} products/second")
+                    logger.info(f"Automation completed successfully in {execution_time:.1f} seconds")
+                    self.print_phase_report()
+                    self.record_run_result(product_count)
+                    return product_count
+                print("HTTP replay unavailable, falling back to browser extraction")
+                # Refresh the request template through the network engine
+                self.engine = "network"
+
             print("Setting up browser...")
             session_reused = self.setup_browser(headless)
+            self.trace_page()
 
             if not self.credentials["username"] or not self.credentials["password"]:
                 raise Exception("Invalid credentials provided")
@@ -735,7 +3211,9 @@ class IdenUnifiedAutomation:
                 self.print_session_info(after="restore")
             else:
                 print("Starting authentication process")
-                if not self.authenticate():
+                with self.timed_phase("authentication"):
+                    authenticated = self.authenticate()
+                if not authenticated:
                     raise Exception("Authentication failed")
                 print("Authentication successful!")
                 
@@ -744,37 +3222,120 @@ class IdenUnifiedAutomation:
             
 
 
-            print("Navigating to product table")
-            if not self.navigate_hidden_path(self.page):
-                raise Exception("Navigation failed")
-            print("Navigation successful!")
+            if self.engine == "network":
+                self.start_response_capture(self.page)
+
+            parallel = self.workers > 1 and self.engine == "dom"
+            if parallel:
+                # Each worker restores the saved session and navigates in its own browser
+                print(f"Using {self.workers} parallel workers for extraction")
+                # Hand the run's account back so a worker can lease it
+                self._release_pool_account()
+            else:
+                print("Navigating to product table")
+                with self.timed_phase("navigation"):
+                    navigated = self.navigate_hidden_path(self.page)
+                if not navigated:
+                    raise Exception("Navigation failed")
+                print("Navigation successful!")
+
+            if self.checkpoint or self.resume:
+                if self.engine == "dom" and not parallel:
+                    self.checkpoint = self.checkpoint or ExtractionCheckpoint()
+                    if self.resume and not self.checkpoint.exists():
+                        print("No checkpoint found, starting a fresh extraction")
+                else:
+                    logger.warning("Checkpoints are only supported for single-worker DOM extraction")
+                    self.checkpoint = None
 
             print(f"Extracting product data (target: {target_count} products)")
-            products = self.extract_product_data(target_count=target_count)
-            if not products:
+            if self.delta_from:
+                # Compare rows against the baseline as they are harvested, so an early stop saves scrolling.
+                # Final mode reads only the rows rendered at the end and cannot stop early, so harvest per step
+                if self.harvest_mode == "final":
+                    logger.info("Delta extraction harvests on every scroll step (final mode becomes incremental)")
+                    self.harvest_mode = "incremental"
+                if self.engine == "network":
+                    products = self.extract_product_data_network(target_count=target_count)
+                elif parallel:
+                    products = self.extract_product_data_parallel(self.workers, target_count=target_count,
+                                                                  headless=headless)
+                else:
+                    products = self.iter_product_data(target_count=target_count)
+                with self.timed_phase("extraction_delta"):
+                    delta_count = self.export_delta(products)
+                if self.checkpoint:
+                    self.checkpoint.clear()
+                execution_time = time.time() - start_time
+                print(f"Automation completed successfully in {execution_time:.1f} seconds")
+                logger.info(f"Automation completed successfully in {execution_time:.1f} seconds")
+                self.print_phase_report()
+                self.metrics.set("delta_rows", delta_count)
+                self.record_run_result(max(delta_count, 1))
+                # Report success even when nothing changed
+                return max(delta_count, 1)
+
+            streaming = self.output_format in STREAMING_FORMATS
+            if self.engine == "network":
+                with self.timed_phase("extraction"):
+                    products = self.extract_product_data_network(target_count=target_count)
+                    self.save_api_template()
+            elif parallel:
+                with self.timed_phase("extraction"):
+                    products = self.extract_product_data_parallel(self.workers, target_count=target_count,
+                                                                  headless=headless)
+            elif streaming:
+                # Rows go to disk as they are harvested, so extraction and export overlap
+                products = self.iter_product_data(target_count=target_count)
+            else:
+                with self.timed_phase("extraction"):
+                    products = self.extract_product_table(target_count=target_count)
+            if isinstance(products, (list, ProductTable)):
+                if not products:
+                    raise Exception("Data extraction failed")
+                print(f"Extracted {len(products)} products")
+
+            print(f"Exporting data ({self.output_format})")
+            with self.timed_phase("extraction_export" if streaming and not isinstance(products, (list, ProductTable))
+                                  else "export"):
+                product_count = self.export_products(products)
+            if not product_count:
                 raise Exception("Data extraction failed")
-            print(f"Extracted {len(products)} products")
-
-            print("Exporting data to JSON")
-            self.export_to_json(products)
+            if streaming:
+                print(f"Streamed {product_count} products")
+            if self.checkpoint:
+                # Output is complete, the checkpoint is no longer needed
+                self.checkpoint.clear()
 
             execution_time = time.time() - start_time
             print(f"Automation completed successfully in {execution_time:.1f} seconds")
-            print(f"Performance: {len(products)/execution_time:.1f} products/second")
+            print(f"Performance: {product_count/execution_time:.1f} products/second")
             logger.info(f"Automation completed successfully in {execution_time:.1f} seconds")
+            self.print_phase_report()
             
             # Show final session status
             self.show_detailed_session_info()
             
-            return len(products)  # Return actual count instead of just True
+            self.record_run_result(product_count)
+            return product_count  # Return actual count instead of just True
 
         except Exception as e:
             error_msg = f"Automation failed: {e}"
             print(f"{error_msg}")
             logger.error(error_msg)
+            if self.checkpoint and self.checkpoint.exists():
+                print("Progress was checkpointed, re-run with --resume to continue")
+            self.record_run_result(0)
             return False
 
         finally:
+            self.report_call_trace()
+            self.write_metrics(time.time() - start_time)
+            if self.checkpoint:
+                self.checkpoint.close()
+            if self.account_pool:
+                self._release_pool_account()
+                self.account_pool.stop_refresher()
             self.cleanup_browser_resources()
 
 def main():
@@ -791,10 +3352,80 @@ Examples:
     parser.add_argument("--headless", action="store_true", help="Run browser in headless mode")
     parser.add_argument("--target-count", type=int, default=2332, help="Target number of products to extract (default: 2332)")
     parser.add_argument("--output", type=str, default="product_data.json", help="Output JSON file name (default: product_data.json)")
+    parser.add_argument("--output-format", choices=list(OUTPUT_EXTENSIONS), default="json",
+                        help="json builds the whole document at the end; ndjson and json-stream write rows "
+                             "to disk as they are harvested; csv, parquet and arrow write typed columns "
+                             "(parquet/arrow need pyarrow) (default: json)")
+    parser.add_argument("--harvest-mode", choices=["final", "incremental", "observer"], default="final",
+                        help="Row harvesting: read the DOM once at the end, collect rows on every scroll step, "
+                             "or drain rows buffered by an in-page MutationObserver (default: final)")
+    parser.add_argument("--engine", choices=["dom", "network"], default="dom",
+                        help="Extraction engine: scroll the table DOM, or read the JSON API behind it (default: dom)")
+    parser.add_argument("--replay", action="store_true",
+                        help="Fetch products by replaying the saved API request over HTTP, without a browser; "
+                             "falls back to the browser if the saved session is rejected")
+    parser.add_argument("--replay-workers", type=int, default=8,
+                        help="Concurrent HTTP connections used by --replay (default: 8)")
+    parser.add_argument("--scroll-strategy", choices=["fixed", "adaptive"], default="fixed",
+                        help="Scroll step sizing: constant step and 2s wait, or adapt step and wait to the "
+                             "observed row growth and render latency (default: fixed)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Harvest the table in N scroll partitions concurrently, each in its own browser "
+                             "restored from the saved session (default: 1)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Use the asyncio engine (overlaps page I/O, file writes and parallel contexts)")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help=f"Append harvested rows to a checkpoint ({CHECKPOINT_FILE}) on every scroll step")
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume an interrupted extraction from its checkpoint (implies --checkpoint)")
+    parser.add_argument("--delta-from", type=str, default=None,
+                        help="Previous output (json/ndjson) or *.index.json to diff against; writes only "
+                             "added, changed and removed products")
+    parser.add_argument("--delta-stop-after", type=int, default=0,
+                        help="In delta mode, stop after N consecutive unchanged products "
+                             "(for tables sorted by update time) (default: 0, scan everything)")
+    parser.add_argument("--key-column", type=str, default=None,
+                        help="Column used to dedupe harvested rows (default: auto-detect an ID column)")
+    parser.add_argument("--deep-link", action="store_true",
+                        help=f"Jump straight to the product table URL recorded in {DEEP_LINK_FILE} by an earlier "
+                             "run, falling back to the button path (which records it)")
+    parser.add_argument("--block-resources", choices=list(BLOCK_PROFILES), default="off",
+                        help="Drop non-essential requests: standard blocks images, media, fonts and analytics/ad "
+                             "hosts; aggressive also blocks stylesheets (default: off)")
+    parser.add_argument("--accounts", type=str, default=None,
+                        help="JSON file of {\"username\", \"password\"} accounts to rotate across runs and "
+                             "parallel workers, each with its own session file")
+    parser.add_argument("--session-dir", type=str, default=SESSION_DIR,
+                        help=f"Directory for the per-account session files of --accounts (default: {SESSION_DIR})")
+    parser.add_argument("--base-url", type=str, default=None,
+                        help="App root to run against instead of the live site, e.g. http://127.0.0.1:8000 for "
+                             "mock_iden_server.py (also settable with IDEN_LOGIN_URL / IDEN_CHALLENGE_URL)")
+    parser.add_argument("--serve-browser", action="store_true",
+                        help="Run a warm, pre-authenticated browser daemon that later runs attach to")
+    parser.add_argument("--daemon-port", type=int, default=9222,
+                        help="CDP port of the browser daemon (default: 9222)")
+    parser.add_argument("--use-browser-daemon", action="store_true",
+                        help=f"Attach to the browser daemon advertised in {BROWSER_ENDPOINT_FILE} instead of "
+                             "launching Chromium (falls back to launching if none is running)")
+    parser.add_argument("--metrics-file", type=str, default=None,
+                        help="Write run metrics (spans, scroll rounds, CDP round trips, rows per step) to this file")
+    parser.add_argument("--metrics-format", choices=["json", "prometheus"], default="json",
+                        help="Format of --metrics-file; prometheus writes a node_exporter textfile (default: json)")
+    parser.add_argument("--trace-calls", action="store_true",
+                        help="Count and time every Playwright call by call site and print the slowest sites")
+    parser.add_argument("--trace-folded", type=str, default=None,
+                        help="With call tracing, also write folded stacks for flamegraph.pl / speedscope to this "
+                             "file (implies --trace-calls)")
+    parser.add_argument("--playwright-trace", type=str, default=None,
+                        help="Record a Playwright trace zip of the run's browser context to this file")
     
     args = parser.parse_args()
+    if args.use_async and args.engine == "network":
+        parser.error("--engine network is only available in the sync engine (drop --async)")
+    if args.use_async and (args.checkpoint or args.resume):
+        parser.error("--checkpoint and --resume are only available in the sync engine (drop --async)")
     
-    if not os.getenv("IDEN_USERNAME") or not os.getenv("IDEN_PASSWORD"):
+    if not args.accounts and (not os.getenv("IDEN_USERNAME") or not os.getenv("IDEN_PASSWORD")):
         print("Error: Missing IDEN_USERNAME / IDEN_PASSWORD environment variables")
         print("Please create a .env file in the current directory with:")
         print("IDEN_USERNAME=your_username")
@@ -804,10 +3435,61 @@ Examples:
         print("export IDEN_PASSWORD=your_password")
         return
 
-    automation = IdenUnifiedAutomation()
+    if args.output_format in ("parquet", "arrow") and pa is None:
+        print(f"Error: --output-format {args.output_format} requires pyarrow (pip install pyarrow)")
+        return
+
+    if args.serve_browser:
+        daemon = IdenUnifiedAutomation()
+        if args.base_url:
+            daemon.set_base_url(args.base_url)
+        daemon.serve_browser(headless=args.headless, port=args.daemon_port)
+        return
+
+    # Match the default output name to the chosen format
+    if args.output == "product_data.json":
+        args.output = "product_data" + OUTPUT_EXTENSIONS[args.output_format]
+    if args.delta_from and os.path.abspath(args.delta_from) == os.path.abspath(args.output):
+        parser.error("--delta-from and --output must differ: the delta would overwrite its own baseline")
+
+    if args.use_async:
+        from iden_async import AsyncIdenUnifiedAutomation
+        automation = AsyncIdenUnifiedAutomation()
+    else:
+        automation = IdenUnifiedAutomation()
     automation.output_file = args.output
+    automation.output_format = args.output_format
+    automation.harvest_mode = args.harvest_mode
+    automation.key_column = args.key_column
+    automation.engine = args.engine
+    automation.replay = args.replay
+    automation.replay_workers = args.replay_workers
+    automation.scroll_strategy = args.scroll_strategy
+    automation.workers = max(1, args.workers)
+    automation.resume = args.resume
+    automation.delta_from = args.delta_from
+    automation.delta_stop_after = args.delta_stop_after
+    automation.use_browser_daemon = args.use_browser_daemon
+    automation.deep_link = args.deep_link
+    automation.metrics_file = args.metrics_file
+    automation.metrics_format = args.metrics_format
+    if args.trace_calls or args.trace_folded:
+        automation.call_tracer = CallTracer(automation.metrics)
+        automation.trace_folded_file = args.trace_folded
+    automation.playwright_trace = args.playwright_trace
+    if args.base_url:
+        automation.set_base_url(args.base_url)
+    if args.block_resources != "off":
+        automation.resource_blocker = ResourceBlocker(args.block_resources)
+    if args.accounts:
+        automation.account_pool = AccountPool.from_file(args.accounts, args.session_dir)
+    if args.checkpoint or args.resume:
+        automation.checkpoint = ExtractionCheckpoint()
     print(f"Running with target count: {args.target_count}, output: {args.output}")
-    result = automation.run(headless=args.headless, target_count=args.target_count)
+    if args.use_async:
+        result = asyncio.run(automation.run(headless=args.headless, target_count=args.target_count))
+    else:
+        result = automation.run(headless=args.headless, target_count=args.target_count)
     if result and isinstance(result, int) and result > 0:  # result is now the actual count of products extracted
         actual_count = result
         print(f"\nAutomation completed successfully")
@@ -817,17 +3499,9 @@ Examples:
         else:
             print(f"Total products extracted: {actual_count} (target {args.target_count} not reached)")
         
-        # Show what session files were created
-        session_files = []
-        if os.path.exists(automation.session_file):
-            session_files.append(automation.session_file)
-        if os.path.exists("session_storage.json"):
-            session_files.append("session_storage.json")
-        if os.path.exists("local_storage.json"):
-            session_files.append("local_storage.json")
-        
-        if session_files:
-            print(f"Session files created: {', '.join(session_files)}")
+        # Show whether a session was saved
+        if automation.session_store.session_storage:
+            print(f"Session saved to: {automation.session_store.path}")
             print("Next time you run this script, it should skip login")
         else:
             print("No session files were created - login will be required next time")
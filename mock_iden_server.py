@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Iden challenge site, for offline end-to-end runs and benchmarks.
+
+Serves the same surface the automation relies on:
+  /                 login form (input[type=email], input[type=password], submit button);
+                    a successful login stores a signed JWT in sessionStorage["authToken"]
+  /challenge        the hidden path (Start Journey -> Continue Search -> Inventory Section ->
+                    Show Product Table) in front of a virtualized product table;
+                    /challenge?view=products opens the table directly
+  /api/login        POST {email, password} -> {token, expires_in}
+  /api/products     GET ?page=N&limit=M with "Authorization: Bearer <token>" -> paginated JSON
+
+The table fetches its rows from /api/products, so the network engine and HTTP replay work
+against it too. Rows are generated deterministically and sorted by update time, newest first.
+
+Usage:
+    python mock_iden_server.py --rows 100000 --window 60 --render-ms 30
+    python iden_unified.py --base-url http://127.0.0.1:8000 --headless
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+CATEGORIES = ["Electronics", "Home", "Garden", "Toys", "Books", "Sports", "Beauty", "Grocery"]
+BASE_TIME = datetime(2025, 1, 1, 12, 0, 0)
+SECRET = b"mock-iden-secret"
+
+DEFAULT_CONFIG = {
+    "rows": 2332,           # products in the table
+    "page_size": 100,       # rows per /api/products page
+    "window": 60,           # rows rendered at once (recycling window); 0 = append rows as they load
+    "latency_ms": 0,        # server delay per /api/products request
+    "render_ms": 0,         # client delay between a scroll and the re-render
+    "token_ttl": 3600,      # seconds until a login token expires
+    "username": None,       # when set, only these credentials are accepted
+    "password": None,
+}
+
+LOGIN_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Iden Challenge - Sign in</title></head>
+<body>
+<h1>Sign in</h1>
+<form id="login">
+  <input type="email" name="email" placeholder="Email" required>
+  <input type="password" name="password" placeholder="Password" required>
+  <button type="submit">Sign in</button>
+</form>
+<p id="error" style="color:red"></p>
+<script>
+document.getElementById("login").addEventListener("submit", async (event) => {
+  event.preventDefault();
+  const form = new FormData(event.target);
+  const response = await fetch("/api/login", {
+    method: "POST",
+    headers: {"Content-Type": "application/json"},
+    body: JSON.stringify({email: form.get("email"), password: form.get("password")}),
+  });
+  if (!response.ok) {
+    document.getElementById("error").textContent = "Invalid credentials";
+    return;
+  }
+  const data = await response.json();
+  sessionStorage.setItem("authToken", data.token);
+  sessionStorage.setItem("user", JSON.stringify({email: form.get("email")}));
+  location.href = "/challenge";
+});
+</script>
+</body></html>
+"""
+
+CHALLENGE_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Iden Challenge</title>
+<style>
+  #table-container { height: 600px; overflow: auto; position: relative; border: 1px solid #ccc; }
+  #spacer { position: relative; }
+  table { border-collapse: collapse; width: 100%; }
+  td, th { height: 35px; padding: 0 8px; border-bottom: 1px solid #eee; text-align: left; white-space: nowrap; }
+  .hidden { display: none; }
+</style></head>
+<body>
+<h1>Iden Challenge</h1>
+<div id="steps"></div>
+<div id="products" class="hidden">
+  <div id="table-container"><div id="spacer">
+    <table id="product-table">
+      <thead><tr><th>ID</th><th>Name</th><th>Category</th><th>Price</th><th>Stock</th><th>Updated</th></tr></thead>
+      <tbody></tbody>
+    </table>
+  </div></div>
+</div>
+<script>
+const CONFIG = __CONFIG__;
+const ROW_HEIGHT = 36;
+// Chromium stops laying out past ~33.5M px; taller tables get a capped spacer and proportional scrolling
+const MAX_SPACER_HEIGHT = 30000000;
+const STEPS = ["Start Journey", "Continue Search", "Inventory Section", "Show Product Table"];
+
+function tokenPayload() {
+  const token = sessionStorage.getItem("authToken");
+  if (!token) return null;
+  try {
+    const payload = JSON.parse(atob(token.split(".")[1].replace(/-/g, "+").replace(/_/g, "/")));
+    return payload.exp * 1000 > Date.now() ? payload : null;
+  } catch (e) { return null; }
+}
+if (!tokenPayload()) location.replace("/");
+
+const container = document.getElementById("table-container");
+const spacer = document.getElementById("spacer");
+const table = document.getElementById("product-table");
+const tbody = table.querySelector("tbody");
+const pages = {};
+const pending = {};
+let total = null;
+let renderTimer = null;
+
+async function loadPage(page) {
+  if (pages[page] || pending[page]) return pending[page];
+  pending[page] = fetch(`/api/products?page=${page}&limit=${CONFIG.page_size}`, {
+    headers: {"Authorization": `Bearer ${sessionStorage.getItem("authToken")}`},
+  }).then(async (response) => {
+    if (response.status === 401) { location.replace("/"); return; }
+    const data = await response.json();
+    pages[page] = data.data;
+    total = data.total;
+    delete pending[page];
+  });
+  return pending[page];
+}
+
+function rowAt(index) {
+  const page = pages[Math.floor(index / CONFIG.page_size) + 1];
+  return page ? page[index % CONFIG.page_size] : null;
+}
+
+function renderRows(start, end) {
+  const html = [];
+  for (let i = start; i < end; i++) {
+    const p = rowAt(i);
+    if (!p) break;
+    html.push(`<tr><td>${p.id}</td><td>${p.name}</td><td>${p.category}</td>` +
+              `<td>$${p.price.toFixed(2)}</td><td>${p.stock}</td><td>${p.updated_at}</td></tr>`);
+  }
+  tbody.innerHTML = html.join("");
+}
+
+async function render() {
+  if (CONFIG.window > 0) {
+    // Virtualized: only a window of rows exists in the DOM, positioned inside a full-height spacer
+    const fullHeight = total * ROW_HEIGHT + ROW_HEIGHT;
+    const height = Math.min(fullHeight, MAX_SPACER_HEIGHT);
+    const scrollTop = container.scrollTop;
+    let firstVisible;
+    if (height < fullHeight) {
+      // Capped spacer: map the scroll fraction onto the row range instead of one row per ROW_HEIGHT
+      const visible = Math.ceil(container.clientHeight / ROW_HEIGHT);
+      const maxScroll = Math.max(height - container.clientHeight, 1);
+      firstVisible = Math.floor(Math.min(scrollTop / maxScroll, 1) * Math.max(total - visible, 0));
+    } else {
+      firstVisible = Math.floor(scrollTop / ROW_HEIGHT);
+    }
+    const first = Math.max(0, firstVisible - 5);
+    const last = Math.min(total, first + CONFIG.window);
+    const firstPage = Math.floor(first / CONFIG.page_size) + 1;
+    const lastPage = Math.floor(Math.max(last - 1, 0) / CONFIG.page_size) + 1;
+    const loads = [];
+    for (let page = firstPage; page <= lastPage; page++) loads.push(loadPage(page));
+    await Promise.all(loads);
+    spacer.style.height = `${height}px`;
+    table.style.position = "absolute";
+    // Keep the first visible row at the top of the viewport in both mappings
+    table.style.top = `${height < fullHeight ? scrollTop - (firstVisible - first) * ROW_HEIGHT : first * ROW_HEIGHT}px`;
+    renderRows(first, last);
+  } else {
+    // Infinite scroll: rows are appended as pages load near the bottom
+    const loaded = Object.keys(pages).length * CONFIG.page_size;
+    const nearBottom = container.scrollTop + container.clientHeight >= container.scrollHeight - 4 * ROW_HEIGHT;
+    if (loaded < total && nearBottom) await loadPage(Object.keys(pages).length + 1);
+    renderRows(0, Math.min(total, Object.keys(pages).length * CONFIG.page_size));
+  }
+}
+
+function scheduleRender() {
+  clearTimeout(renderTimer);
+  renderTimer = setTimeout(render, CONFIG.render_ms);
+}
+
+async function showProducts() {
+  document.getElementById("steps").classList.add("hidden");
+  document.getElementById("products").classList.remove("hidden");
+  history.replaceState(null, "", "/challenge?view=products");
+  await loadPage(1);
+  await render();
+  container.addEventListener("scroll", scheduleRender);
+}
+
+function showStep(index) {
+  const steps = document.getElementById("steps");
+  steps.innerHTML = "";
+  const button = document.createElement("button");
+  button.textContent = STEPS[index];
+  button.addEventListener("click", () => {
+    if (index + 1 < STEPS.length) showStep(index + 1);
+    else showProducts();
+  });
+  steps.appendChild(button);
+}
+
+if (new URLSearchParams(location.search).get("view") === "products") showProducts();
+else showStep(0);
+</script>
+</body></html>
+"""
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def make_token(subject: str, ttl: int) -> str:
+    """HS256 JWT for subject, expiring in ttl seconds."""
+    header = _b64url(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    payload = _b64url(json.dumps({"sub": subject, "exp": int(time.time()) + ttl}).encode())
+    signature = hmac.new(SECRET, f"{header}.{payload}".encode(), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64url(signature)}"
+
+
+def verify_token(token: str) -> bool:
+    try:
+        header, payload, signature = token.split(".")
+        expected = hmac.new(SECRET, f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(_b64url(expected), signature):
+            return False
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return claims["exp"] > time.time()
+    except (ValueError, KeyError):
+        return False
+
+
+def product(index: int) -> Dict[str, Any]:
+    """Deterministic product at row index; newer products come first."""
+    return {
+        "id": index + 1,
+        "name": f"Product {index + 1:07d}",
+        "category": CATEGORIES[(index * 7) % len(CATEGORIES)],
+        "price": round(5 + (index * 37 % 9500) / 100, 2),
+        "stock": index * 13 % 500,
+        "updated_at": (BASE_TIME - timedelta(minutes=index)).strftime("%Y-%m-%d %H:%M"),
+    }
+
+
+class MockIdenHandler(BaseHTTPRequestHandler):
+    server_version = "MockIden/1.0"
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.server.config
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data: Any) -> None:
+        self._send(status, json.dumps(data).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/":
+            self._send(200, LOGIN_HTML.encode("utf-8"), "text/html; charset=utf-8")
+        elif url.path == "/challenge":
+            page = CHALLENGE_HTML.replace("__CONFIG__", json.dumps({
+                "page_size": self.config["page_size"],
+                "window": self.config["window"],
+                "render_ms": self.config["render_ms"],
+            }))
+            self._send(200, page.encode("utf-8"), "text/html; charset=utf-8")
+        elif url.path == "/api/products":
+            self._products(parse_qs(url.query))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/api/login":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid json"})
+            return
+        email, password = body.get("email"), body.get("password")
+        required_user, required_password = self.config["username"], self.config["password"]
+        if not email or not password or (required_user and (email, password) != (required_user, required_password)):
+            self._send_json(401, {"error": "invalid credentials"})
+            return
+        self._send_json(200, {"token": make_token(email, self.config["token_ttl"]),
+                              "expires_in": self.config["token_ttl"]})
+
+    def _products(self, query: Dict[str, Any]) -> None:
+        auth = self.headers.get("Authorization", "")
+        if not auth.startswith("Bearer ") or not verify_token(auth[len("Bearer "):]):
+            self._send_json(401, {"error": "unauthorized"})
+            return
+        if self.config["latency_ms"]:
+            time.sleep(self.config["latency_ms"] / 1000)
+        try:
+            page = max(1, int(query.get("page", ["1"])[0]))
+            limit = max(1, min(1000, int(query.get("limit", [str(self.config["page_size"])])[0])))
+        except ValueError:
+            self._send_json(400, {"error": "invalid page or limit"})
+            return
+        total = self.config["rows"]
+        start = (page - 1) * limit
+        data = [product(i) for i in range(start, min(total, start + limit))]
+        next_url = f"/api/products?{urlencode({'page': page + 1, 'limit': limit})}" if start + limit < total else None
+        self._send_json(200, {"data": data, "total": total, "page": page, "limit": limit, "next": next_url})
+
+
+def start_server(host: str = "127.0.0.1", port: int = 8000, verbose: bool = False,
+                 **config) -> ThreadingHTTPServer:
+    """Start the mock server in a daemon thread. Stop it with server.shutdown(); its root is server.url."""
+    server = ThreadingHTTPServer((host, port), MockIdenHandler)
+    server.daemon_threads = True
+    server.config = {**DEFAULT_CONFIG, **config}
+    server.verbose = verbose
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="mock-iden-server", daemon=True).start()
+    return server
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Local mock of the Iden challenge site")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on; 0 picks a free one (default: 8000)")
+    parser.add_argument("--rows", type=int, default=DEFAULT_CONFIG["rows"], help="Products in the table (default: 2332)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_CONFIG["page_size"],
+                        help="Rows per API page (default: 100)")
+    parser.add_argument("--window", type=int, default=DEFAULT_CONFIG["window"],
+                        help="Rows rendered at once; 0 appends rows as they load instead of recycling (default: 60)")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Delay per products API request (default: 0)")
+    parser.add_argument("--render-ms", type=int, default=0, help="Delay between scroll and re-render (default: 0)")
+    parser.add_argument("--token-ttl", type=int, default=DEFAULT_CONFIG["token_ttl"],
+                        help="Login token lifetime in seconds (default: 3600)")
+    parser.add_argument("--username", default=None, help="Only accept this username (default: any)")
+    parser.add_argument("--password", default=None, help="Only accept this password (default: any)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    server = start_server(args.host, args.port, verbose=args.verbose, rows=args.rows, page_size=args.page_size,
+                          window=args.window, latency_ms=args.latency_ms, render_ms=args.render_ms,
+                          token_ttl=args.token_ttl, username=args.username, password=args.password)
+    print(f"Mock Iden server on {server.url} ({args.rows} products, window {args.window})")
+    print(f"Run the automation with: python iden_unified.py --base-url {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("Stopping mock server")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()